@@ -1,11 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import base64
-from app.logic import extract_information
+from app.logic import extract_information_from_bytes
+from app.scheduler import extraction_scheduler
 from app.pdf.image_extractor import extract_images_from_pdf_byte_stream_by_page
-from app.util.endpoint_data_util import convert_page_image_dict_to_json
 from app.pdf.image_extractor import extract_text_from_image_byte_stream, extract_text_from_image_file_path
+from app.util import config
+from app.util.admission import AdmissionRejected, admission_controller
+from app.util.content_store import compute_document_digest, get_document, get_result, result_key
+from app.util.compression import CorruptRequestBody, RequestBodyTooLarge, choose_response_encoding, compress_body, compress_stream, decompress_request_body
+from app.util.json_util import dumps
+from app.util.ocr import get_ocr_profile
+from app.util.preflight import DocumentRejected, MalformedDocument, inspect_document
+from app.util.traffic_recorder import record_extract_request
+from app.util.tracing import span, traced
 from app.util.util import decode_base64_to_bytes, reconstruct_image_from_byte_stream
 from flask_cors import CORS
+from io import BytesIO
+from werkzeug.wsgi import get_input_stream
 
 # Set the path to the installed Tesseract binary in the container
 
@@ -13,11 +24,149 @@ app = Flask(__name__)
 
 CORS(app, resources={r"/*": {"origins": ["http://localhost:8089", "http://127.0.0.1:8089"]}})
 
+@app.before_request
+def decompress_request():
+    """
+    Replaces a gzip or zstd compressed request body with its decompressed content
+    before any view reads it.
+    """
+    content_encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if not content_encoding or content_encoding == 'identity':
+        return None
+
+    try:
+        body = decompress_request_body(get_input_stream(request.environ), content_encoding,
+                                       config.MAX_DECOMPRESSED_REQUEST_BYTES)
+    except RequestBodyTooLarge as e:
+        return jsonify({"message": str(e)}), 413
+    except CorruptRequestBody as e:
+        return jsonify({"message": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 415
+
+    # The request body has not been read yet, so the view sees the decompressed body
+    request.environ['wsgi.input'] = BytesIO(body)
+    request.environ['CONTENT_LENGTH'] = str(len(body))
+    request.environ.pop('HTTP_CONTENT_ENCODING', None)
+    return None
+
+@app.after_request
+def compress_response(response):
+    """
+    Compresses the response body according to the Accept-Encoding header of the request.
+    Streamed responses are compressed chunk by chunk, other responses only above a minimum size.
+    """
+    response.vary.add('Accept-Encoding')
+
+    if response.direct_passthrough or 'Content-Encoding' in response.headers or response.status_code < 200:
+        return response
+
+    content_encoding = choose_response_encoding(request.headers.get('Accept-Encoding', ''))
+    if content_encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, content_encoding,
+                                            config.RESPONSE_GZIP_LEVEL, config.RESPONSE_ZSTD_LEVEL)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        response.set_data(compress_body(body, content_encoding,
+                                        config.RESPONSE_GZIP_LEVEL, config.RESPONSE_ZSTD_LEVEL))
+
+    response.headers['Content-Encoding'] = content_encoding
+    return response
+
 @app.route('/')
 def hello_world():
     return 'Hello World!'
 
+def validate_extraction_options(data):
+    """
+    Validates the 'file_type' and 'ocr_profile' fields shared by /extract and /extract/precheck.
+
+    :param data: Parsed JSON body of the request
+    :return: An error response tuple, or None if the fields are valid
+    """
+    # Validate 'file_type' field
+    if 'file_type' not in data:
+        return jsonify({"message": "'file_type' field is missing"}), 400
+
+    if not isinstance(data['file_type'], str):
+        return jsonify({"message": "'file_type' must be a string"}), 400
+
+    # Ensure 'file_type' is one of the allowed types
+    allowed_file_types = {"PDF", "PPTX", "DOCX", "TXT"}
+    if data['file_type'].upper() not in allowed_file_types:
+        return jsonify({
+            "message": f"'file_type' must be one of {', '.join(allowed_file_types)}"
+        }), 400
+
+    # Validate the optional 'ocr_profile' field
+    ocr_profile = data.get('ocr_profile')
+    if ocr_profile is not None:
+        if not isinstance(ocr_profile, str):
+            return jsonify({"message": "'ocr_profile' must be a string"}), 400
+
+        try:
+            get_ocr_profile(ocr_profile)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+    return None
+
+def run_extraction(file_type, document_byte_stream, ocr_profile):
+    """
+    Inspects, admits and schedules the extraction of a decoded document and builds the response.
+
+    :param file_type: Validated file type of the request
+    :param document_byte_stream: Decoded document bytes
+    :param ocr_profile: OCR profile name of the request, None for the default
+    :return: The Flask response
+    """
+    # Reject documents over the configured limits before they are parsed
+    try:
+        inspection = inspect_document(file_type.upper(), document_byte_stream)
+    except DocumentRejected as e:
+        return jsonify({"message": str(e)}), 413
+    except MalformedDocument as e:
+        return jsonify({"message": str(e)}), 422
+
+    # Record the request for the load harness when traffic recording is enabled
+    record_extract_request(file_type, document_byte_stream, request.headers.get('Prefer', ''), ocr_profile)
+
+    return_representation = request.headers.get('Prefer', '').__contains__('return=representation')
+    collapse_object = request.headers.get('Prefer', '').__contains__('return=collapse')
+
+    # Answer re-uploaded documents from the stored result without taking admission or scheduler capacity
+    stored_result = get_result(compute_document_digest(document_byte_stream),
+                               result_key(str(file_type), return_representation, collapse_object, get_ocr_profile(ocr_profile)))
+    if stored_result is not None:
+        return Response(dumps(stored_result), status=200, mimetype="application/json")
+
+    # Admit the document only if the service has capacity for it
+    try:
+        with admission_controller.admit(file_type, len(document_byte_stream), inspection.image_count) as small:
+            # If all validations pass, run the extraction when the scheduler dispatches it.
+            # Small documents have their own admission lane and do not wait for a slot behind scans.
+            response_object = extraction_scheduler.run(inspection, lambda stage_timings: extract_information_from_bytes(
+                str(file_type), document_byte_stream, return_representation, collapse_object, ocr_profile, stage_timings),
+                wait_for_slot=not small)
+    except AdmissionRejected as e:
+        response = jsonify({"message": str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
+
+    # Encode the result directly to JSON bytes instead of going through jsonify
+    with span("serialize"):
+        response_body = dumps(response_object)
+
+    return Response(response_body, status=200, mimetype="application/json")
+
 @app.route('/extract', methods=['POST'])
+@traced("extract")
 def extract():
     """
     Endpoint to validate and process JSON data sent via POST request.
@@ -35,28 +184,58 @@ def extract():
 
         # Ensure 'data' is base64 encoded
         try:
-            base64.b64decode(data['data'])
+            document_byte_stream = base64.b64decode(data['data'])
         except (base64.binascii.Error, ValueError):
             return jsonify({"message": "'data' field is not valid base64 encoded"}), 400
 
-        # Validate 'file_type' field
-        if 'file_type' not in data:
-            return jsonify({"message": "'file_type' field is missing"}), 400
+        error_response = validate_extraction_options(data)
+        if error_response is not None:
+            return error_response
+
+        return run_extraction(data['file_type'], document_byte_stream, data.get('ocr_profile'))
+
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@app.route('/extract/precheck', methods=['POST'])
+@traced("extract.precheck")
+def extract_precheck():
+    """
+    Digest-first variant of /extract: the client sends the SHA-256 digest of the document
+    with the same 'file_type', 'ocr_profile' and Prefer header it would send to /extract.
+    If the service already holds the result, or the document to compute it from, the result
+    is returned without an upload. Otherwise 404 tells the client to upload the document to /extract.
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"message": "No JSON data provided"}), 400
+
+        # Validate 'sha256' field
+        digest = data.get('sha256')
+        if not isinstance(digest, str) or len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest.lower()):
+            return jsonify({"message": "'sha256' must be a hex encoded SHA-256 digest"}), 400
+        digest = digest.lower()
 
-        if not isinstance(data['file_type'], str):
-            return jsonify({"message": "'file_type' must be a string"}), 400
+        error_response = validate_extraction_options(data)
+        if error_response is not None:
+            return error_response
 
-        # Ensure 'file_type' is one of the allowed types
-        allowed_file_types = {"PDF", "PPTX", "DOCX", "TXT"}
-        if data['file_type'].upper() not in allowed_file_types:
-            return jsonify({
-                "message": f"'file_type' must be one of {', '.join(allowed_file_types)}"
-            }), 400
+        # Answer from the stored result without touching the document
+        key = result_key(str(data['file_type']), request.headers.get('Prefer', '').__contains__('return=representation'),
+                         request.headers.get('Prefer', '').__contains__('return=collapse'),
+                         get_ocr_profile(data.get('ocr_profile')))
+        stored_result = get_result(digest, key)
+        if stored_result is not None:
+            return Response(dumps(stored_result), status=200, mimetype="application/json")
 
-        # If all validations pass
-        response_object = extract_information(str(data['file_type']), data['data'], request.headers.get('Prefer', '').__contains__('return=representation'), request.headers.get('Prefer', '').__contains__('return=collapse'))
+        # Extract from the stored document if only the result for these options is missing
+        document_byte_stream = get_document(digest)
+        if document_byte_stream is not None:
+            return run_extraction(data['file_type'], document_byte_stream, data.get('ocr_profile'))
 
-        return jsonify(response_object), 200
+        return jsonify({"message": "Document is not known, upload it to /extract", "missing": "data"}), 404
 
     except Exception as e:
         return jsonify({"message": str(e)}), 500
@@ -0,0 +1,289 @@
+"""
+Bulk extraction from the command line, without going through HTTP.
+
+Examples:
+
+    python -m app.cli documents/ --output-jsonl results.jsonl
+    python -m app.cli "scans/**/*.pdf" --ocr-profile fast --workers 16 --output-dir results/
+    python -m app.cli --manifest files.txt --output-jsonl results.jsonl --representation
+
+Successfully extracted files are appended to a checkpoint file (by default next to the output),
+and skipped when the same command is run again after an interruption. Files that failed are
+retried by the next run, so the JSONL output may hold an error record and a later result for
+the same path. Results are shared with the service through the page store and the content store.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from app.logic import extract_information_from_bytes
+from app.util import config
+from app.util.json_util import dumps
+from app.util.ocr import OCR_PROFILES
+from app.util.preflight import inspect_document
+
+# File types by extension, other files are detected from their content
+FILE_TYPES_BY_EXTENSION = {".pdf": "PDF", ".docx": "DOCX", ".pptx": "PPTX", ".txt": "TXT"}
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def detect_file_type(file_path, document_byte_stream):
+    """
+    Detects the file type of a document from its extension, or from its magic bytes.
+
+    :param file_path: Path of the document
+    :param document_byte_stream: Content of the document
+    :return: "PDF", "DOCX", "PPTX", "TXT" or None if the format is not supported
+    """
+    file_type = FILE_TYPES_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+    if file_type:
+        return file_type
+
+    if document_byte_stream.startswith(b"%PDF"):
+        return "PDF"
+
+    if document_byte_stream.startswith(b"PK\x03\x04"):
+        # Office documents are zip packages, told apart by their main part
+        try:
+            with zipfile.ZipFile(io.BytesIO(document_byte_stream)) as package:
+                names = set(package.namelist())
+        except zipfile.BadZipFile:
+            return None
+        if "word/document.xml" in names:
+            return "DOCX"
+        if "ppt/presentation.xml" in names:
+            return "PPTX"
+        return None
+
+    try:
+        document_byte_stream.decode("utf-8")
+        return "TXT"
+    except UnicodeDecodeError:
+        return None
+
+
+def iter_input_files(inputs, manifest):
+    """
+    Lists the files to extract from directories, glob patterns, file paths and a manifest.
+
+    :param inputs: Directories, glob patterns or file paths
+    :param manifest: Path of a file listing one document path per line, or None
+    :return: A generator of file paths
+    """
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                if line.strip():
+                    yield line.strip()
+
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for directory, _, file_names in os.walk(input_path):
+                for file_name in sorted(file_names):
+                    yield os.path.join(directory, file_name)
+        elif os.path.isfile(input_path):
+            yield input_path
+        else:
+            for file_path in sorted(glob.iglob(input_path, recursive=True)):
+                if os.path.isfile(file_path):
+                    yield file_path
+
+
+def _init_worker():
+    # Files are already spread over the pool, so large PDFs are not sharded again inside a worker
+    config.PDF_SHARD_WORKERS = 1
+    # A backfill must not copy the whole corpus into the content store
+    config.CONTENT_STORE_KEEP_DOCUMENTS = False
+
+
+def _new_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def extract_file(file_path, return_representation, collapse_object, ocr_profile):
+    """
+    Extracts a single file in a worker process.
+
+    :return: A dictionary with the path, file type, size, seconds and either the result or an error
+    """
+    started = time.perf_counter()
+    record = {"path": file_path, "file_type": None, "size": 0}
+
+    try:
+        with open(file_path, "rb") as document_file:
+            document_byte_stream = document_file.read()
+        record["size"] = len(document_byte_stream)
+
+        file_type = detect_file_type(file_path, document_byte_stream)
+        if file_type is None:
+            raise ValueError("Unsupported file format")
+        record["file_type"] = file_type
+
+        # Apply the same pre-flight limits as the service
+        inspect_document(file_type, document_byte_stream)
+
+        record["result"] = extract_information_from_bytes(file_type, document_byte_stream, return_representation,
+                                                          collapse_object, ocr_profile)
+    except (OSError, ValueError) as e:
+        record["error"] = str(e)
+    except Exception as e:
+        record["error"] = f"An error occurred: {e}"
+
+    record["seconds"] = time.perf_counter() - started
+    return record
+
+
+def _output_path(output_dir, file_path):
+    """
+    Returns the path of the per-file output of a document, mirroring its path under the output directory.
+    """
+    relative_path = os.path.splitdrive(os.path.abspath(file_path))[1].lstrip(os.sep)
+    return os.path.join(output_dir, f"{relative_path}.json")
+
+
+def _load_checkpoint(checkpoint_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as checkpoint_file:
+        return {line.rstrip("\n") for line in checkpoint_file if line.strip()}
+
+
+def run(args):
+    """
+    Runs the bulk extraction described by the parsed command line arguments.
+
+    :return: The process exit code
+    """
+    checkpoint_path = args.checkpoint or f"{args.output_jsonl or args.output_dir.rstrip(os.sep)}.checkpoint"
+    completed = _load_checkpoint(checkpoint_path)
+    if completed:
+        print(f"Resuming, {len(completed)} files already done", file=sys.stderr)
+
+    output_file = open(args.output_jsonl, "ab") if args.output_jsonl else None
+    checkpoint_file = open(checkpoint_path, "a", encoding="utf-8")
+
+    done = errors = total_bytes = 0
+    started = last_report = time.perf_counter()
+
+    def report(final=False):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"{'Finished' if final else 'Progress'}: {done} files, {errors} errors, "
+              f"{done / elapsed:.2f} files/s, {total_bytes / elapsed / (1024 * 1024):.2f} MiB/s", file=sys.stderr)
+
+    def write_record(record):
+        nonlocal done, errors, total_bytes
+        done += 1
+        total_bytes += record["size"]
+        if "error" in record:
+            errors += 1
+
+        if output_file is not None:
+            output_file.write(dumps(record) + b"\n")
+            output_file.flush()
+        else:
+            output_path = _output_path(args.output_dir, record["path"])
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, "wb") as per_file_output:
+                per_file_output.write(dumps(record))
+
+        # Only checkpoint files extracted successfully, failed files are retried by the next run
+        if "error" not in record:
+            checkpoint_file.write(record["path"] + "\n")
+            checkpoint_file.flush()
+
+    pool = _new_pool(args.workers)
+    # Submitted files by future, with the pool running them
+    pending = {}
+
+    def replace_pool(broken_pool):
+        nonlocal pool
+        if pool is broken_pool:
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+            pool = _new_pool(args.workers)
+
+    def submit(file_path):
+        try:
+            future = pool.submit(extract_file, file_path, args.representation, args.collapse, args.ocr_profile)
+        except BrokenProcessPool:
+            replace_pool(pool)
+            future = pool.submit(extract_file, file_path, args.representation, args.collapse, args.ocr_profile)
+        pending[future] = (file_path, pool)
+
+    def collect(finished):
+        for future in finished:
+            file_path, future_pool = pending.pop(future)
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. a crash inside a native library). Every file the pool
+                # held fails with it, and a new pool takes the remaining files.
+                record = {"path": file_path, "file_type": None, "size": 0, "seconds": 0.0,
+                          "error": "Worker process crashed while the file was queued or extracted"}
+                replace_pool(future_pool)
+            except Exception as e:
+                record = {"path": file_path, "file_type": None, "size": 0, "seconds": 0.0,
+                          "error": f"An error occurred: {e}"}
+            write_record(record)
+
+    try:
+        for file_path in iter_input_files(args.inputs, args.manifest):
+            if file_path in completed:
+                continue
+
+            # Bound the number of queued files so huge inputs are listed lazily
+            if len(pending) >= args.workers * 4:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+            submit(file_path)
+
+            if time.perf_counter() - last_report >= PROGRESS_INTERVAL_SECONDS:
+                report()
+                last_report = time.perf_counter()
+
+        while pending:
+            finished, _ = wait(pending, timeout=PROGRESS_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+            collect(finished)
+            report()
+
+    finally:
+        pool.shutdown(cancel_futures=True)
+        checkpoint_file.close()
+        if output_file is not None:
+            output_file.close()
+
+    report(final=True)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract text from documents in bulk, without the HTTP service.")
+    parser.add_argument("inputs", nargs="*", help="directories, glob patterns or files to extract")
+    parser.add_argument("--manifest", default=None, help="file listing one document path per line")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output-jsonl", default=None, help="append one JSON result per line to this file")
+    output.add_argument("--output-dir", default=None, help="write one JSON result per file under this directory")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file, defaults to the output path + .checkpoint")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--ocr-profile", default=None, choices=list(OCR_PROFILES), help="OCR profile")
+    parser.add_argument("--representation", action="store_true", help="return the per-section representation")
+    parser.add_argument("--collapse", action="store_true", help="collapse the result into a single string")
+    args = parser.parse_args(argv)
+
+    if not args.inputs and not args.manifest:
+        parser.error("no inputs given")
+    args.workers = max(args.workers, 1)
+
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
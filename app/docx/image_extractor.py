@@ -2,21 +2,24 @@ import zipfile
 import io
 import xml.etree.ElementTree as ET
 from docx import Document
-from PIL import Image
-import pytesseract
-from app.util.util import reconstruct_image_from_byte_stream, delete_file
+from app.util.ocr import get_ocr_profile, ocr_image_byte_stream
+from app.util.tracing import span
 
 
-def extract_images_from_docx_byte_stream(docx_byte_stream):
+def extract_images_from_docx_byte_stream(docx_byte_stream, ocr_profile=None):
     """
-    Extracts images from a DOCX byte stream and returns them in a dictionary with paragraph numbers as keys.
-    Each value is a list of image byte streams associated with that paragraph.
+    Extracts images from a DOCX byte stream and performs OCR on them.
+    Returns a dictionary with paragraph numbers as keys and lists of
+    OCR-extracted text of the images in that paragraph as values.
 
     :param docx_byte_stream: Byte stream of the DOCX file
+    :param ocr_profile: OcrProfile used for the images, None for the configured default
     :return: A dictionary where the keys are paragraph numbers (1-based)
-             and the values are lists of byte streams for the images on that paragraph.
+             and the values are lists of extracted text from the images on that paragraph.
     """
     try:
+        ocr_profile = ocr_profile or get_ocr_profile()
+
         # Load the DOCX byte stream
         docx_file = io.BytesIO(docx_byte_stream)
 
@@ -32,7 +35,8 @@ def extract_images_from_docx_byte_stream(docx_byte_stream):
                 "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}Relationship")}
 
             # Parse the document.xml content
-            tree = ET.fromstring(document_xml)
+            with span("document.open", file_type="DOCX"):
+                tree = ET.fromstring(document_xml)
             namespace = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
 
             # Dictionary to store images by paragraph number
@@ -58,9 +62,10 @@ def extract_images_from_docx_byte_stream(docx_byte_stream):
                             image_file_path = rels.get(image_ref)
 
                             if image_file_path:
-                                # Extract the image data from the DOCX zip file
-                                image_data = docx_zip.read("word/" + image_file_path)
-                                images_on_para.append(image_data)
+                                # Extract the image data from the DOCX zip file and OCR it
+                                with span("image", paragraph_number=para_idx + 1, part=image_file_path):
+                                    image_data = docx_zip.read("word/" + image_file_path)
+                                    images_on_para.append(extract_text_from_image_byte_stream(image_data, ocr_profile))
 
                 # If images are found in the paragraph, store them
                 if images_on_para:
@@ -71,27 +76,16 @@ def extract_images_from_docx_byte_stream(docx_byte_stream):
         return f"An error occurred: {e}"
 
 
-def extract_text_from_image_byte_stream(image_byte_stream):
+def extract_text_from_image_byte_stream(image_byte_stream, ocr_profile=None):
     """
     Extracts text from an image byte stream using OCR.
 
     Args:
         image_byte_stream (bytes): Byte stream of the image.
+        ocr_profile (OcrProfile): Profile to use, None for the configured default.
 
     Returns:
         str: Extracted text from the image.
     """
-    # Reconstruct the image from the byte stream to a temp file
-    temp_file_path = reconstruct_image_from_byte_stream(image_byte_stream,
-                                                        r"C:\Users\Nazrin\PycharmProjects\ExtractorService\temp")
-
-    # Open the image using PIL
-    image = Image.open(temp_file_path)
-
-    # Perform OCR on the image
-    extracted_text = pytesseract.image_to_string(image)
-
-    # Delete the temporary image file
-    delete_file(temp_file_path)
-
-    return extracted_text
+    # Perform OCR on the image in memory
+    return ocr_image_byte_stream(image_byte_stream, ocr_profile)
@@ -1,5 +1,6 @@
 from docx import Document
 import io
+from app.util.tracing import span
 
 
 def extract_text_from_byte_stream_by_paragraph(docx_byte_stream):
@@ -13,7 +14,8 @@ def extract_text_from_byte_stream_by_paragraph(docx_byte_stream):
     """
     try:
         # Load the .docx file from the byte stream
-        docx_document = Document(io.BytesIO(docx_byte_stream))
+        with span("document.open", file_type="DOCX"):
+            docx_document = Document(io.BytesIO(docx_byte_stream))
 
         # Initialize a dictionary to store text by paragraph number
         text_by_paragraph = {}
@@ -1,65 +1,121 @@
+import time
 from app.pdf.image_extractor import extract_images_from_pdf_byte_stream_by_page
 from app.pdf.text_extractor import extract_text_from_byte_stream_by_page
+from app.pdf.link_extractor import extract_hyperlinks_from_byte_stream_by_page
 from app.docx.text_extractor import extract_text_from_byte_stream_by_paragraph
 from app.docx.image_extractor import extract_text_from_image_byte_stream, extract_images_from_docx_byte_stream
 from app.pptx.image_extractor import extract_images_from_pptx_byte_stream
 from app.pptx.text_extractor import extract_text_from_pptx_byte_stream
 from app.txt.text_extractor import extract_text_from_txt_byte_stream
-from app.util.endpoint_data_util import convert_page_text_dict_to_json, convert_page_image_dict_to_json, construct_data_json, simplify_data_json, collapse_data_object
+from app.util.content_store import compute_document_digest, get_result, put_document, put_result, result_key
+from app.util.ocr import get_ocr_profile, is_ocr_error
+from app.util.page_record import build_page_records, render_page_records
+from app.util.perceptual_hash import document_scope
+from app.util.tracing import span
 from app.util.util import decode_base64_to_bytes
 
-def extract_information(file_type, data, return_representation=False, collapse_object=False):
+def _run_stage(stage_timings, stage, function, *args):
+    """
+    Runs an extraction stage and adds its duration to the stage timings.
+
+    :param stage_timings: Dictionary of stage name to seconds, None to skip timing
+    :param stage: Name of the stage ("text", "image" or "link")
+    :param function: Extractor to run
+    :return: The result of the extractor
+    """
+    with span(f"stage.{stage}"):
+        if stage_timings is None:
+            return function(*args)
+
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            stage_timings[stage] = stage_timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def extract_information(file_type, data, return_representation=False, collapse_object=False, ocr_profile=None,
+                        stage_timings=None):
     """
 
     :param return_representation:
     :param file_type: string which is a value from enumeration of file_format_enum.py
     :type data: base64 encoded string of the document's byte stream
+    :param ocr_profile: name of the OCR profile ("fast", "balanced", "accurate"), None for the default
+    :param stage_timings: optional dictionary filled with the seconds spent in each extraction stage
     """
 
     document_byte_stream = decode_base64_to_bytes(data)
 
-    if file_type == "PDF":
-        page_image_dict = extract_images_from_pdf_byte_stream_by_page(document_byte_stream)
-        page_text_dict = extract_text_from_byte_stream_by_page(document_byte_stream)
-        data_json_object = construct_data_json(
-            convert_page_image_dict_to_json(page_image_dict),
-            convert_page_text_dict_to_json(page_text_dict)
-        )
-    elif file_type == "DOCX":
-        page_text_dict = extract_text_from_byte_stream_by_paragraph(document_byte_stream)
-        page_image_dict = extract_images_from_docx_byte_stream(document_byte_stream)
-        data_json_object = construct_data_json(
-            convert_page_text_dict_to_json(page_text_dict),
-            convert_page_image_dict_to_json(page_image_dict)
-        )
-    elif file_type == "PPTX":
-        page_text_dict = extract_text_from_pptx_byte_stream(document_byte_stream)
-        page_image_dict = extract_images_from_pptx_byte_stream(document_byte_stream)
-        data_json_object = construct_data_json(
-            convert_page_text_dict_to_json(page_text_dict),
-            convert_page_image_dict_to_json(page_image_dict)
-        )
-    elif file_type == "TXT":
-        page_text_dict = extract_text_from_txt_byte_stream(document_byte_stream)
-        data_json_object = construct_data_json(
-            convert_page_text_dict_to_json(page_text_dict)
-        )
-    else:
-        return f"Unsupported file type: {file_type}"
-
-    if not return_representation:
-        data_json_object = simplify_data_json(data_json_object)
-        if collapse_object:
-            data_json_object = collapse_data_object(data_json_object)
-
-    # Create json object with the property file_type and data
-    result = {
-        "file_type": file_type,
-        "data": data_json_object['data']
-    }
-
-    return result
+    return extract_information_from_bytes(file_type, document_byte_stream, return_representation, collapse_object,
+                                          ocr_profile, stage_timings)
+
+
+def extract_information_from_bytes(file_type, document_byte_stream, return_representation=False,
+                                   collapse_object=False, ocr_profile=None, stage_timings=None):
+    """
+    Same as extract_information, for a document that is already decoded.
+    Results are stored by document digest and extraction options, and returned
+    from the store when the same document is extracted again with the same options.
+
+    :param file_type: string which is a value from enumeration of file_format_enum.py
+    :param document_byte_stream: raw bytes of the document
+    :param return_representation: whether to return the per-section representation
+    :param collapse_object: whether to collapse the simplified output into a single string
+    :param ocr_profile: name of the OCR profile ("fast", "balanced", "accurate"), None for the default
+    :param stage_timings: optional dictionary filled with the seconds spent in each extraction stage
+    """
+
+    with span("extract_information", file_type=file_type, size=len(document_byte_stream),
+              representation=return_representation, collapse=collapse_object):
+        ocr_profile = get_ocr_profile(ocr_profile)
+        page_link_dict = None
+
+        # Return the stored result if this document was extracted with the same options before
+        digest = compute_document_digest(document_byte_stream)
+        key = result_key(file_type, return_representation, collapse_object, ocr_profile)
+        stored_result = get_result(digest, key)
+        if stored_result is not None:
+            return stored_result
+
+        # Images are only recognised as boilerplate across distinct documents
+        with document_scope(digest):
+            if file_type == "PDF":
+                page_image_dict = _run_stage(stage_timings, "image", extract_images_from_pdf_byte_stream_by_page, document_byte_stream, ocr_profile)
+                page_text_dict = _run_stage(stage_timings, "text", extract_text_from_byte_stream_by_page, document_byte_stream)
+                sections = ["image", "text"]
+
+                # Links are only part of the representation output, skip the work otherwise
+                if return_representation:
+                    page_link_dict = _run_stage(stage_timings, "link", extract_hyperlinks_from_byte_stream_by_page, document_byte_stream)
+                    sections.append("link")
+            elif file_type == "DOCX":
+                page_text_dict = _run_stage(stage_timings, "text", extract_text_from_byte_stream_by_paragraph, document_byte_stream)
+                page_image_dict = _run_stage(stage_timings, "image", extract_images_from_docx_byte_stream, document_byte_stream, ocr_profile)
+                sections = ["text", "image"]
+            elif file_type == "PPTX":
+                page_text_dict = _run_stage(stage_timings, "text", extract_text_from_pptx_byte_stream, document_byte_stream)
+                page_image_dict = _run_stage(stage_timings, "image", extract_images_from_pptx_byte_stream, document_byte_stream, ocr_profile)
+                sections = ["text", "image"]
+            elif file_type == "TXT":
+                page_text_dict = _run_stage(stage_timings, "text", extract_text_from_txt_byte_stream, document_byte_stream)
+                page_image_dict = None
+                sections = ["text"]
+            else:
+                return f"Unsupported file type: {file_type}"
 
+        # Build ordered page records once and render the requested output shape from them
+        page_records = build_page_records(page_text_dict, page_image_dict, page_link_dict)
 
+        # Create json object with the property file_type and data
+        result = {
+            "file_type": file_type,
+            "data": render_page_records(page_records, sections, return_representation, collapse_object)
+        }
 
+        # Keep the document and its result for digest-first requests, unless an image failed to OCR
+        put_document(digest, document_byte_stream)
+        if not any(is_ocr_error(text) for record in page_records for text in record.images or ()):
+            put_result(digest, key, result)
 
+        return result
@@ -0,0 +1,113 @@
+import re
+import uuid
+
+from app.util.page_store import fingerprint
+
+# Indirect reference inside a PDF object definition, e.g. "12 0 R"
+_REFERENCE = re.compile(rb"(\d+) (\d+) R\b")
+
+# Deepest chain of references followed before a page is treated as unique
+MAX_REFERENCE_DEPTH = 100
+
+
+def _object_digest(pdf_document, xref, object_digests, visiting):
+    """
+    Computes a digest of a PDF object and of every object it references, directly or indirectly.
+    References are replaced by the digest of the referenced object, so the digest does not
+    depend on xref numbers, which are renumbered when a document is rewritten.
+
+    :param pdf_document: Open fitz document the object belongs to
+    :param xref: xref number of the object
+    :param object_digests: Digests computed so far for the document, by xref
+    :param visiting: xref numbers of the objects being digested, used to break reference cycles
+    :return: Hex digest of the object
+    """
+    if xref in object_digests:
+        return object_digests[xref]
+    if xref in visiting or not 0 < xref < pdf_document.xref_length():
+        return "-"
+    if len(visiting) >= MAX_REFERENCE_DEPTH:
+        # Never match a page whose resources cannot be digested completely
+        return uuid.uuid4().hex
+
+    visiting.add(xref)
+    try:
+        definition = _resolve_references(pdf_document, pdf_document.xref_object(xref, compressed=True),
+                                         object_digests, visiting)
+        parts = [definition]
+
+        # Content streams of Form XObjects, font programs, ToUnicode CMaps and image data
+        if pdf_document.xref_is_stream(xref):
+            parts.append(pdf_document.xref_stream_raw(xref) or b"")
+    finally:
+        visiting.discard(xref)
+
+    object_digests[xref] = fingerprint(*parts)
+    return object_digests[xref]
+
+
+def _resolve_references(pdf_document, definition, object_digests, visiting):
+    """
+    Replaces the indirect references of an object definition by the digests of the referenced objects.
+
+    :param pdf_document: Open fitz document the definition belongs to
+    :param definition: PDF source of an object or dictionary
+    :param object_digests: Digests computed so far for the document, by xref
+    :param visiting: xref numbers of the objects being digested
+    :return: The definition with references replaced, as bytes
+    """
+    return _REFERENCE.sub(
+        lambda match: _object_digest(pdf_document, int(match.group(1)), object_digests, visiting).encode("ascii"),
+        definition.encode("utf-8", "backslashreplace"))
+
+
+def _page_resources(pdf_document, page):
+    """
+    Returns the PDF source of the resource dictionary of a page, following
+    the page tree when the page inherits its resources.
+
+    :param pdf_document: Open fitz document the page belongs to
+    :param page: fitz page
+    :return: The resource dictionary or reference, empty if the page has none
+    """
+    xref = page.xref
+    for _ in range(64):
+        value_type, value = pdf_document.xref_get_key(xref, "Resources")
+        if value_type != "null":
+            return value
+
+        value_type, value = pdf_document.xref_get_key(xref, "Parent")
+        if value_type != "xref":
+            break
+        xref = int(value.split()[0])
+
+    return ""
+
+
+def fingerprint_pdf_page(pdf_document, page, object_digests=None):
+    """
+    Computes a content fingerprint of a PDF page from its geometry, its decompressed
+    content streams and its resources: fonts with their encodings and ToUnicode CMaps,
+    images and Form XObjects, followed recursively. Pages with the same fingerprint
+    produce the same extraction results, even across document versions.
+
+    :param pdf_document: Open fitz document the page belongs to
+    :param page: fitz page to fingerprint
+    :param object_digests: Dictionary shared by the pages of a document, so that
+                           resources used by many pages are digested once
+    :return: Hex fingerprint of the page
+    """
+    if object_digests is None:
+        object_digests = {}
+
+    # Page geometry affects the order in which text is extracted
+    parts = [f"{tuple(page.rect)}:{page.rotation}"]
+
+    # The content streams hold the text drawing operators of the page
+    for xref in page.get_contents():
+        parts.append(pdf_document.xref_stream(xref) or b"")
+
+    # The same operators show different text under different fonts or forms
+    parts.append(_resolve_references(pdf_document, _page_resources(pdf_document, page), object_digests, set()))
+
+    return fingerprint(*parts)
@@ -1,10 +1,12 @@
 import fitz
-from app.util.util import pdf_to_byte_stream, reconstruct_image_from_byte_stream, delete_file
+from app.pdf.fingerprint import fingerprint_pdf_page
+from app.util.page_store import get_page_result, put_page_result
+from app.util.tracing import span
+from app.util.ocr import get_ocr_profile, ocr_image, ocr_image_byte_stream
+from app.util.util import pdf_to_byte_stream
 from PIL import Image
-import pytesseract
-import io
 
-def extract_images_from_pdf_by_page(pdf_path):
+def extract_images_from_pdf_by_page(pdf_path, ocr_profile=None):
     """
     Extracts images from each page of a PDF (provided as a file path)
     and returns them in a dictionary with page numbers as keys.
@@ -12,12 +14,13 @@ def extract_images_from_pdf_by_page(pdf_path):
     If no images are found on a page, an empty list is returned for that page.
 
     :param pdf_path: Path to the PDF file
+    :param ocr_profile: OcrProfile used for the images, None for the configured default
     :return: A dictionary where the keys are page numbers (1-based)
              and the values are lists of byte streams for the images on that page
     """
-    return extract_images_from_pdf_byte_stream_by_page(pdf_to_byte_stream(pdf_path))
+    return extract_images_from_pdf_byte_stream_by_page(pdf_to_byte_stream(pdf_path), ocr_profile)
 
-def extract_images_from_pdf_byte_stream_by_page(pdf_byte_stream):
+def extract_images_from_pdf_byte_stream_by_page(pdf_byte_stream, ocr_profile=None):
     """
     Extracts images from each page of a PDF (provided as a byte stream)
     and returns them in a dictionary with page numbers as keys.
@@ -25,32 +28,50 @@ def extract_images_from_pdf_byte_stream_by_page(pdf_byte_stream):
     If no images are found on a page, an empty list is returned for that page.
 
     :param pdf_byte_stream: Byte stream of the PDF file
+    :param ocr_profile: OcrProfile used for the images, None for the configured default
     :return: A dictionary where the keys are page numbers (1-based)
              and the values are lists of byte streams for the images on that page
     """
     try:
+        ocr_profile = ocr_profile or get_ocr_profile()
+
+        # OCR results depend on the profile, so it is part of the store key
+        store_namespace = f"pdf-image-{ocr_profile.name}"
+
         # Open the PDF from the byte stream
-        pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
+        with span("document.open", file_type="PDF"):
+            pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
 
         # Initialize the dictionary to store images by page number
         images_by_page = {}
+        object_digests = {}
 
         # Iterate through all the pages in the PDF
         for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)  # Load the page
-            image_list = page.get_images(full=True)  # Get all images on the page
+            with span("page", page_number=page_num + 1):
+                page = pdf_document.load_page(page_num)  # Load the page
+
+                # Reuse the stored OCR results if this page was extracted before
+                page_fingerprint = fingerprint_pdf_page(pdf_document, page, object_digests)
+                images_on_page = get_page_result(store_namespace, page_fingerprint)
 
-            # List to store byte streams for images on the current page
-            images_on_page = []
+                if images_on_page is None:
+                    image_list = page.get_images(full=True)  # Get all images on the page
 
-            # Loop through the images on this page
-            for img_index, img in enumerate(image_list):
-                xref = img[0]  # The image reference (xref)
-                base_image = pdf_document.extract_image(xref)  # Extract the image data
-                image_bytes = base_image["image"]  # Get the image bytes
+                    # List to store byte streams for images on the current page
+                    images_on_page = []
 
-                # Append the byte stream for this image to the list
-                images_on_page.append(extract_text_from_image_byte_stream(image_bytes))
+                    # Loop through the images on this page
+                    for img_index, img in enumerate(image_list):
+                        xref = img[0]  # The image reference (xref)
+                        base_image = pdf_document.extract_image(xref)  # Extract the image data
+                        image_bytes = base_image["image"]  # Get the image bytes
+
+                        # Append the byte stream for this image to the list
+                        with span("image", xref=xref, width=base_image["width"], height=base_image["height"]):
+                            images_on_page.append(extract_text_from_image_byte_stream(image_bytes, ocr_profile))
+
+                    put_page_result(store_namespace, page_fingerprint, images_on_page)
 
             # Add the page entry to the dictionary (empty list if no images)
             images_by_page[page_num + 1] = images_on_page
@@ -63,36 +84,27 @@ def extract_images_from_pdf_byte_stream_by_page(pdf_byte_stream):
     except Exception as e:
         return f"An error occurred: {e}"
 
-def extract_text_from_image_byte_stream(image_byte_stream):
+def extract_text_from_image_byte_stream(image_byte_stream, ocr_profile=None):
     """
     Extracts text from an image byte stream using OCR.
 
     Args:
         image_byte_stream (bytes): Byte stream of the image.
+        ocr_profile (OcrProfile): Profile to use, None for the configured default.
 
     Returns:
         str: Extracted text from the image.
     """
+    # Perform OCR on the image in memory
+    return ocr_image_byte_stream(image_byte_stream, ocr_profile)
 
-    # Create a temp file from the byte stream and return the file path
-    temp_file_path = reconstruct_image_from_byte_stream(image_byte_stream, r"C:\Users\Nazrin\PycharmProjects\ExtractorService\temp")
-
-    # Convert the byte stream to a PIL Image
-    image = Image.open(temp_file_path)
-
-    # Perform OCR on the image
-    extracted_text = pytesseract.image_to_string(image)
-
-    delete_file(temp_file_path)
-
-    return extracted_text
-
-def extract_text_from_image_file_path(image_file_path):
+def extract_text_from_image_file_path(image_file_path, ocr_profile=None):
     """
     Extracts text from an image file using OCR.
 
     Args:
         image_file_path (str): Path to the image file.
+        ocr_profile (OcrProfile): Profile to use, None for the configured default.
 
     Returns:
         str: Extracted text from the image.
@@ -101,6 +113,6 @@ def extract_text_from_image_file_path(image_file_path):
     image = Image.open(image_file_path)
 
     # Perform OCR on the image
-    extracted_text = pytesseract.image_to_string(image)
+    extracted_text = ocr_image(image, ocr_profile)
 
     return extracted_text
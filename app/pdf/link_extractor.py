@@ -1,17 +1,74 @@
 import fitz  # PyMuPDF
+from app.util.tracing import span
 from app.util.util import pdf_to_byte_stream
 
+# Size in points of the grid cells used to index the words of a page
+WORD_GRID_CELL_SIZE = 50
+
+
+def _build_word_index(words):
+    """
+    Builds a uniform grid index over the words of a page so that the words
+    inside a rectangle can be found without scanning the whole page.
+
+    :param words: Word tuples as returned by page.get_text("words")
+    :return: A dictionary mapping (column, row) grid cells to lists of word indices
+    """
+    word_index = {}
+
+    for word_idx, word in enumerate(words):
+        x0, y0, x1, y1 = word[:4]
+
+        # Register the word in every cell its bounding box touches
+        for column in range(int(x0 // WORD_GRID_CELL_SIZE), int(x1 // WORD_GRID_CELL_SIZE) + 1):
+            for row in range(int(y0 // WORD_GRID_CELL_SIZE), int(y1 // WORD_GRID_CELL_SIZE) + 1):
+                word_index.setdefault((column, row), []).append(word_idx)
+
+    return word_index
+
+
+def _get_text_in_rect(words, word_index, rect):
+    """
+    Returns the text of the words whose centre lies inside a rectangle, in reading order.
+
+    :param words: Word tuples as returned by page.get_text("words")
+    :param word_index: Grid index built by _build_word_index
+    :param rect: fitz.Rect of the link
+    :return: The link text
+    """
+    candidates = set()
+
+    # Collect the words registered in the cells covered by the link rectangle
+    for column in range(int(rect.x0 // WORD_GRID_CELL_SIZE), int(rect.x1 // WORD_GRID_CELL_SIZE) + 1):
+        for row in range(int(rect.y0 // WORD_GRID_CELL_SIZE), int(rect.y1 // WORD_GRID_CELL_SIZE) + 1):
+            candidates.update(word_index.get((column, row), ()))
+
+    matched = []
+    for word_idx in candidates:
+        x0, y0, x1, y1, text, block_no, line_no, word_no = words[word_idx][:8]
+
+        # Keep the word if its centre falls inside the link rectangle
+        if rect.x0 <= (x0 + x1) / 2 <= rect.x1 and rect.y0 <= (y0 + y1) / 2 <= rect.y1:
+            matched.append((block_no, line_no, word_no, text))
+
+    # Sort by block, line and word number to restore reading order
+    return " ".join(text for _, _, _, text in sorted(matched))
+
+
 def extract_hyperlinks_from_byte_stream_by_page(pdf_byte_stream):
     """
     Extracts hyperlinks from a PDF byte stream and returns a dictionary with page numbers as keys.
     Each value is a list of tuples containing the link text and the real link (URL).
+    The words of each page are read once and indexed, so the cost of resolving
+    link text does not grow with the number of links on the page.
 
     :param pdf_byte_stream: Byte stream of the PDF file
     :return: A dictionary where keys are page numbers (1-based) and values are lists of (link text, link URL) tuples
     """
     try:
         # Open the PDF from the byte stream
-        pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
+        with span("document.open", file_type="PDF"):
+            pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
 
         # Dictionary to store hyperlinks by page
         hyperlinks_by_page = {}
@@ -19,25 +76,29 @@ def extract_hyperlinks_from_byte_stream_by_page(pdf_byte_stream):
         # Loop through each page in the PDF
         for page_num in range(len(pdf_document)):
             page = pdf_document.load_page(page_num)  # Load the page
-            links = page.get_links()  # Get all links on the page
+
+            # Only keep links that point to a URI
+            links = [link for link in page.get_links() if link.get("uri")]
 
             # List to store (link text, real link) tuples for this page
             page_links = []
 
-            # Process each link on the page
-            for link in links:
-                # Extract the real link (URL)
-                uri = link.get("uri")
-                if uri:  # Only process if a URI is found
-                    # Try to get the link text if possible
+            if links:
+                # Read and index the words of the page once for all of its links
+                with span("page.links", page_number=page_num + 1, link_count=len(links)):
+                    words = page.get_text("words")
+                    word_index = _build_word_index(words)
+
+                # Process each link on the page
+                for link in links:
                     rect = link.get("from")  # The rectangle containing the link text
                     if rect:
-                        link_text = page.get_textbox(rect).strip()
+                        link_text = _get_text_in_rect(words, word_index, rect)
                     else:
                         link_text = ""  # Fallback if no link text is available
 
                     # Add the (link text, real link) tuple to the page's list
-                    page_links.append((link_text, uri))
+                    page_links.append((link_text, link["uri"]))
 
             # Add the page's links to the dictionary (even if empty)
             hyperlinks_by_page[page_num + 1] = page_links
@@ -59,4 +120,3 @@ def extract_hyperlinks_from_file_by_page(pdf_path):
     :return: A dictionary where keys are page numbers (1-based) and values are lists of (link text, link URL) tuples
     """
     return extract_hyperlinks_from_byte_stream_by_page(pdf_to_byte_stream(pdf_path))
-
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.util import config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """
+    Returns the process pool shared by all sharded extractions, creating it on first use.
+    Workers are spawned rather than forked because the Flask server is multi-threaded.
+
+    :return: The ProcessPoolExecutor
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=config.PDF_SHARD_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool):
+    """
+    Drops a broken process pool so that the next sharded extraction starts a new one.
+
+    :param pool: The ProcessPoolExecutor that broke
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def should_shard(page_count):
+    """
+    Tells whether a PDF is large enough to be processed in page shards.
+
+    :param page_count: Number of pages of the PDF
+    :return: True if the document should be split across worker processes
+    """
+    return config.PDF_SHARD_WORKERS > 1 and config.PDF_SHARD_MIN_PAGES > 0 and page_count >= config.PDF_SHARD_MIN_PAGES
+
+
+def page_ranges(page_count, shard_pages):
+    """
+    Splits the pages of a document into consecutive ranges.
+
+    :param page_count: Number of pages of the document
+    :param shard_pages: Number of pages per range
+    :return: A list of (start, stop) tuples of 0-based page indices, stop excluded
+    """
+    return [(start, min(start + shard_pages, page_count)) for start in range(0, page_count, shard_pages)]
+
+
+def run_sharded(pdf_byte_stream, page_count, page_range_function):
+    """
+    Runs a page range function over all pages of a PDF in worker processes and
+    merges the results in page order. The PDF is written once to a temporary file
+    which every worker opens itself, so the document is never pickled.
+    If the pool breaks, the document is extracted in the current process.
+
+    :param pdf_byte_stream: Byte stream of the PDF file (bytes or BytesIO)
+    :param page_count: Number of pages of the PDF
+    :param page_range_function: Picklable function (pdf_path, start, stop) -> list of (page number, result)
+    :return: A dictionary where the keys are the page numbers (1-based) and the values are the results
+    """
+    if hasattr(pdf_byte_stream, "getbuffer"):
+        pdf_byte_stream = pdf_byte_stream.getbuffer()
+
+    # Share the document through a file instead of sending it to every worker
+    temp_file = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with temp_file:
+            temp_file.write(pdf_byte_stream)
+
+        pool = _get_pool()
+        try:
+            futures = [pool.submit(page_range_function, temp_file.name, start, stop)
+                       for start, stop in page_ranges(page_count, max(config.PDF_SHARD_PAGES, 1))]
+
+            # Futures are in page order, so merging them keeps the pages sorted
+            results_by_page = {}
+            for future in futures:
+                results_by_page.update(future.result())
+
+            return results_by_page
+
+        except BrokenProcessPool:
+            # A worker died (e.g. a crash inside MuPDF). Replace the pool for later
+            # documents and extract this one in the current process instead.
+            _discard_pool(pool)
+            return dict(page_range_function(temp_file.name, 0, page_count))
+
+    finally:
+        os.remove(temp_file.name)
@@ -1,11 +1,57 @@
 import fitz  # PyMuPDF
+from app.pdf.fingerprint import fingerprint_pdf_page
+from app.pdf.sharding import run_sharded, should_shard
+from app.util.page_store import get_page_result, put_page_result
+from app.util.tracing import span
 from app.util.util import pdf_to_byte_stream
 
 
+def _extract_text_from_page(pdf_document, page_num, object_digests):
+    """
+    Extracts the text of a single page, reusing the stored text if the page was extracted before.
+
+    :param pdf_document: Open fitz document
+    :param page_num: 0-based index of the page
+    :param object_digests: Resource digests shared by the pages of the document
+    :return: The extracted text of the page
+    """
+    with span("page", page_number=page_num + 1):
+        page = pdf_document.load_page(page_num)  # Get the page
+
+        # Reuse the stored text if this page was extracted before
+        page_fingerprint = fingerprint_pdf_page(pdf_document, page, object_digests)
+        text = get_page_result("pdf-text", page_fingerprint)
+
+        if text is None:
+            text = page.get_text()  # Extract text from the page
+            put_page_result("pdf-text", page_fingerprint, text)
+
+        return text
+
+
+def _extract_text_from_page_range(pdf_path, start, stop):
+    """
+    Extracts the text of a range of pages in a worker process.
+
+    :param pdf_path: Path of the PDF file shared by the workers
+    :param start: 0-based index of the first page
+    :param stop: 0-based index after the last page
+    :return: A list of (page number (1-based), text) tuples
+    """
+    pdf_document = fitz.open(pdf_path)
+    object_digests = {}
+    try:
+        return [(page_num + 1, _extract_text_from_page(pdf_document, page_num, object_digests))
+                for page_num in range(start, stop)]
+    finally:
+        pdf_document.close()
+
+
 def extract_text_from_byte_stream_by_page(pdf_byte_stream):
     """
     Extracts text from each page of a PDF using a byte stream (in-memory)
     and returns it in a dictionary with page number as the key.
+    Large documents are split into page ranges extracted by worker processes.
 
     :param pdf_byte_stream: Byte stream of the PDF file
     :return: A dictionary where the keys are the page numbers (1-based)
@@ -13,18 +59,24 @@ def extract_text_from_byte_stream_by_page(pdf_byte_stream):
     """
     try:
         # Open the PDF from the byte stream
-        pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
+        with span("document.open", file_type="PDF"):
+            pdf_document = fitz.open(stream=pdf_byte_stream, filetype="pdf")
+        page_count = len(pdf_document)
+
+        # Hand large documents to the worker processes
+        if should_shard(page_count):
+            pdf_document.close()
+            with span("pdf.shards", page_count=page_count):
+                return run_sharded(pdf_byte_stream, page_count, _extract_text_from_page_range)
 
         # Initialize a dictionary to store text by page number
         text_by_page = {}
+        object_digests = {}
 
         # Loop through all the pages
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)  # Get the page
-            text = page.get_text()  # Extract text from the page
-
+        for page_num in range(page_count):
             # Store the extracted text in the dictionary with page number as key (1-based index)
-            text_by_page[page_num + 1] = text
+            text_by_page[page_num + 1] = _extract_text_from_page(pdf_document, page_num, object_digests)
 
         # Close the PDF document
         pdf_document.close()
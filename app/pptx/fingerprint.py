@@ -0,0 +1,26 @@
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from app.util.page_store import fingerprint
+
+# Relationships that do not contribute to what is extracted from the slide itself
+_IGNORED_RELATIONSHIP_TYPES = {RT.SLIDE_LAYOUT, RT.NOTES_SLIDE}
+
+
+def fingerprint_slide(slide):
+    """
+    Computes a content fingerprint of a PowerPoint slide from the slide XML part
+    and the parts it references (images, media, charts).
+
+    :param slide: python-pptx slide to fingerprint
+    :return: Hex fingerprint of the slide
+    """
+    parts = [slide.part.blob]
+
+    # Sort by relationship id so the fingerprint does not depend on dictionary order
+    for r_id, rel in sorted(slide.part.rels.items()):
+        if rel.is_external or rel.reltype in _IGNORED_RELATIONSHIP_TYPES:
+            continue
+        parts.append(r_id)
+        parts.append(rel.target_part.blob)
+
+    return fingerprint(*parts)
@@ -1,39 +1,59 @@
 from pptx import Presentation
-from PIL import Image
-import pytesseract
 import io
+from app.pptx.fingerprint import fingerprint_slide
+from app.util.ocr import OCR_ERROR_PREFIX, get_ocr_profile, is_ocr_error, ocr_image_byte_stream
+from app.util.page_store import get_page_result, put_page_result
+from app.util.tracing import span
 
-def extract_images_from_pptx_byte_stream(pptx_byte_stream):
+def extract_images_from_pptx_byte_stream(pptx_byte_stream, ocr_profile=None):
     """
     Extracts images from each slide of a PowerPoint file (provided as a byte stream)
     and performs OCR on them. Returns a dictionary with slide numbers as keys
     and lists of OCR-extracted text as values.
 
     :param pptx_byte_stream: Byte stream of the PowerPoint (.pptx) file
+    :param ocr_profile: OcrProfile used for the images, None for the configured default
     :return: A dictionary where keys are slide numbers (1-based)
              and values are lists of extracted text from the images on that slide
     """
     try:
+        ocr_profile = ocr_profile or get_ocr_profile()
+
+        # OCR results depend on the profile, so it is part of the store key
+        store_namespace = f"pptx-image-{ocr_profile.name}"
+
         # Open the PowerPoint presentation from the byte stream
-        presentation = Presentation(io.BytesIO(pptx_byte_stream))
+        with span("document.open", file_type="PPTX"):
+            presentation = Presentation(io.BytesIO(pptx_byte_stream))
 
         # Initialize the dictionary to store OCR results by slide number
         text_by_slide = {}
 
         # Iterate through all the slides in the presentation
         for slide_num, slide in enumerate(presentation.slides, start=1):
-            ocr_results = []
+            with span("page", page_number=slide_num):
+                # Reuse the stored OCR results if this slide was extracted before
+                slide_fingerprint = fingerprint_slide(slide)
+                ocr_results = get_page_result(store_namespace, slide_fingerprint)
+
+                if ocr_results is None:
+                    ocr_results = []
 
-            # Loop through all shapes on the slide
-            for shape in slide.shapes:
-                # Check if the shape contains a picture
-                if shape.shape_type == 13:  # Shape type 13 corresponds to pictures
-                    image = shape.image
-                    image_bytes = image.blob  # Get the raw image bytes
+                    # Loop through all shapes on the slide
+                    for shape in slide.shapes:
+                        # Check if the shape contains a picture
+                        if shape.shape_type == 13:  # Shape type 13 corresponds to pictures
+                            image = shape.image
+                            image_bytes = image.blob  # Get the raw image bytes
 
-                    # Extract text from the image byte stream using OCR
-                    extracted_text = extract_text_from_image_byte_stream(image_bytes)
-                    ocr_results.append(extracted_text)
+                            # Extract text from the image byte stream using OCR
+                            with span("image", shape_id=shape.shape_id, content_type=image.content_type):
+                                extracted_text = extract_text_from_image_byte_stream(image_bytes, ocr_profile)
+                            ocr_results.append(extracted_text)
+
+                    # A failed OCR may succeed next time, only store complete slides
+                    if not any(is_ocr_error(text) for text in ocr_results):
+                        put_page_result(store_namespace, slide_fingerprint, ocr_results)
 
             # Store the OCR results for the slide (empty list if no images)
             text_by_slide[slide_num] = ocr_results
@@ -43,24 +63,20 @@ def extract_images_from_pptx_byte_stream(pptx_byte_stream):
     except Exception as e:
         return f"An error occurred: {e}"
 
-def extract_text_from_image_byte_stream(image_byte_stream):
+def extract_text_from_image_byte_stream(image_byte_stream, ocr_profile=None):
     """
     Extracts text from an image byte stream using OCR.
 
     Args:
         image_byte_stream (bytes): Byte stream of the image.
+        ocr_profile (OcrProfile): Profile to use, None for the configured default.
 
     Returns:
         str: Extracted text from the image.
     """
     try:
-        # Convert the byte stream to a PIL Image
-        image = Image.open(io.BytesIO(image_byte_stream))
-
         # Perform OCR on the image
-        extracted_text = pytesseract.image_to_string(image)
-
-        return extracted_text
+        return ocr_image_byte_stream(image_byte_stream, ocr_profile)
 
     except Exception as e:
-        return f"An error occurred while performing OCR: {e}"
+        return f"{OCR_ERROR_PREFIX}{e}"
@@ -1,5 +1,8 @@
 from pptx import Presentation
 from io import BytesIO
+from app.pptx.fingerprint import fingerprint_slide
+from app.util.page_store import get_page_result, put_page_result
+from app.util.tracing import span
 
 def extract_text_from_pptx_byte_stream(pptx_byte_stream):
     """
@@ -13,13 +16,22 @@ def extract_text_from_pptx_byte_stream(pptx_byte_stream):
     try:
         # Load the PowerPoint file from the byte stream
         pptx_file = BytesIO(pptx_byte_stream)
-        presentation = Presentation(pptx_file)
+        with span("document.open", file_type="PPTX"):
+            presentation = Presentation(pptx_file)
 
         # Initialize a dictionary to store text by slide number
         text_by_slide = {}
 
         # Loop through all slides in the presentation
         for slide_num, slide in enumerate(presentation.slides, start=1):
+            # Reuse the stored text if this slide was extracted before
+            slide_fingerprint = fingerprint_slide(slide)
+            stored_text = get_page_result("pptx-text", slide_fingerprint)
+
+            if stored_text is not None:
+                text_by_slide[slide_num] = stored_text
+                continue
+
             slide_text = []
 
             # Extract text from all shapes on the slide
@@ -30,6 +42,7 @@ def extract_text_from_pptx_byte_stream(pptx_byte_stream):
 
             # Combine all text from the slide into a single string and store it
             text_by_slide[slide_num] = "\n".join(slide_text)
+            put_page_result("pptx-text", slide_fingerprint, text_by_slide[slide_num])
 
         return text_by_slide
 
@@ -0,0 +1,197 @@
+import threading
+import time
+
+from app.util import config
+from app.util.page_store import count_reused_units
+from app.util.tracing import span
+
+# Initial cost rates in seconds, replaced over time by measured stage timings
+DEFAULT_COST_RATES = {
+    # Text extraction per PDF page or PPTX slide
+    "text_per_page": 0.005,
+    # Text extraction per MiB of DOCX/TXT document
+    "text_per_megabyte": 0.05,
+    # OCR per embedded image
+    "image_per_image": 0.3,
+    # OCR per megapixel of embedded images
+    "image_per_megapixel": 0.4,
+}
+
+# Fixed overhead of every extraction in seconds
+BASE_COST_SECONDS = 0.01
+
+# Smallest amount of text work a DOCX/TXT document is counted for, in MiB
+MIN_TEXT_MEGABYTES = 0.1
+
+
+class CostModel:
+    """
+    Predicts the extraction time of a document from its pre-flight inspection and
+    calibrates its per-file-type rates from the measured duration of each stage.
+    """
+
+    def __init__(self, calibration_weight):
+        self.calibration_weight = calibration_weight
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, file_type, name):
+        return self._rates.get((file_type, name), DEFAULT_COST_RATES[name])
+
+    @staticmethod
+    def _text_units(inspection):
+        """
+        Returns the amount of text work of a document and the rate it is measured with.
+        """
+        if inspection.file_type in {"PDF", "PPTX"}:
+            return "text_per_page", max(inspection.page_count, 1)
+
+        # Tiny documents are dominated by fixed costs, count them as a minimum amount of work
+        return "text_per_megabyte", max(inspection.size / (1024 * 1024), MIN_TEXT_MEGABYTES)
+
+    def estimate(self, inspection):
+        """
+        Estimates the extraction time of a document.
+
+        :param inspection: DocumentInspection of the document
+        :return: Predicted seconds
+        """
+        text_rate, text_units = self._text_units(inspection)
+        megapixels = inspection.image_pixels / 1_000_000
+
+        with self._lock:
+            return (BASE_COST_SECONDS
+                    + self._rate(inspection.file_type, text_rate) * text_units
+                    + self._rate(inspection.file_type, "image_per_image") * inspection.image_count
+                    + self._rate(inspection.file_type, "image_per_megapixel") * megapixels)
+
+    def observe(self, inspection, stage_timings, reused_units=None):
+        """
+        Updates the rates of a file type from the measured stage timings of an extraction.
+        Pages and images answered from the page store or the boilerplate index are not
+        counted as work, so cached runs do not pull the rates towards zero.
+        The image stage time is split between the per-image and per-megapixel rates
+        in proportion to their current contribution.
+
+        :param inspection: DocumentInspection of the extracted document
+        :param stage_timings: Dictionary of stage name to measured seconds
+        :param reused_units: Dictionary of stage name to units that were reused instead of extracted
+        """
+        reused_units = reused_units or {}
+        file_type = inspection.file_type
+        weight = self.calibration_weight
+
+        with self._lock:
+            def update(name, measured_rate):
+                current = self._rate(file_type, name)
+                self._rates[(file_type, name)] = (1 - weight) * current + weight * measured_rate
+
+            text_rate, text_units = self._text_units(inspection)
+            if text_rate == "text_per_page":
+                text_units -= reused_units.get("text", 0)
+            if "text" in stage_timings and text_units > 0:
+                update(text_rate, stage_timings["text"] / text_units)
+
+            # Reused images are assumed to have the average size of the document's images
+            image_count = inspection.image_count - reused_units.get("image", 0)
+            if "image" in stage_timings and image_count > 0:
+                megapixels = inspection.image_pixels / 1_000_000 * image_count / inspection.image_count
+                per_image = self._rate(file_type, "image_per_image") * image_count
+                per_megapixel = self._rate(file_type, "image_per_megapixel") * megapixels
+                predicted = per_image + per_megapixel
+
+                if predicted > 0:
+                    share = per_image / predicted
+                    update("image_per_image", stage_timings["image"] * share / image_count)
+                    if megapixels > 0:
+                        update("image_per_megapixel", stage_timings["image"] * (1 - share) / megapixels)
+
+
+class _Job:
+    __slots__ = ("estimate", "enqueued_at", "dispatched")
+
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.enqueued_at = time.monotonic()
+        self.dispatched = False
+
+
+class ExtractionScheduler:
+    """
+    Runs extractions on a fixed number of slots, dispatching waiting jobs by shortest
+    expected extraction time. A job's priority improves the longer it waits, so large
+    jobs are eventually dispatched even under a steady stream of small ones.
+    """
+
+    def __init__(self, slots, aging_rate, cost_model):
+        self.slots = max(slots, 1)
+        self.aging_rate = aging_rate
+        self.cost_model = cost_model
+
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = []
+
+    def _priority(self, job, now):
+        return job.estimate - self.aging_rate * (now - job.enqueued_at)
+
+    def _dispatch_next(self):
+        """
+        Dispatches the waiting job with the best priority, called with the condition held.
+        """
+        if not self._waiting or self._running >= self.slots:
+            return
+
+        now = time.monotonic()
+        job = min(self._waiting, key=lambda waiting_job: self._priority(waiting_job, now))
+        self._waiting.remove(job)
+        job.dispatched = True
+        self._running += 1
+        self._condition.notify_all()
+
+    def run(self, inspection, function, wait_for_slot=True):
+        """
+        Waits for a slot, then runs an extraction and calibrates the cost model with its stage timings.
+
+        :param inspection: DocumentInspection of the document
+        :param function: Function taking a stage timings dictionary and running the extraction
+        :param wait_for_slot: False to run at once without taking a slot, for documents of the
+                              small-document admission lane that must not queue behind scans
+        :return: The result of the function
+        """
+        if wait_for_slot:
+            job = _Job(self.cost_model.estimate(inspection))
+
+            with span("scheduler.wait", estimate_seconds=job.estimate), self._condition:
+                self._waiting.append(job)
+                self._dispatch_next()
+                while not job.dispatched:
+                    self._condition.wait()
+
+        stage_timings = {}
+        reused_units = {}
+        try:
+            with count_reused_units(reused_units):
+                result = function(stage_timings)
+        finally:
+            if wait_for_slot:
+                with self._condition:
+                    self._running -= 1
+                    self._dispatch_next()
+
+        self.cost_model.observe(inspection, stage_timings, reused_units)
+        return result
+
+    def queue_length(self):
+        """
+        Returns the number of jobs waiting for a slot.
+        """
+        with self._condition:
+            return len(self._waiting)
+
+
+extraction_scheduler = ExtractionScheduler(
+    config.SCHEDULER_SLOTS,
+    config.SCHEDULER_AGING_RATE,
+    CostModel(config.SCHEDULER_CALIBRATION_WEIGHT),
+)
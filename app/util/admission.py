@@ -0,0 +1,111 @@
+import threading
+from contextlib import contextmanager
+
+from app.util import config
+from app.util.ocr import ocr_queue_depth
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a document cannot be admitted because the service is at capacity.
+
+    Attributes:
+        status_code: HTTP status to answer with (429 or 503)
+        retry_after: Seconds the client should wait before retrying
+    """
+
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits the work in flight: the number of documents being extracted, their total
+    size and the OCR queue depth. Small TXT documents and small DOCX documents without
+    images go through a separate lane with its own document limit, so they are admitted
+    while large documents are queued. A limit of 0 disables it.
+    """
+
+    def __init__(self, max_documents, max_bytes, max_ocr_queue_depth, small_lane_max_documents,
+                 small_document_max_bytes, retry_after):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.max_ocr_queue_depth = max_ocr_queue_depth
+        self.small_lane_max_documents = small_lane_max_documents
+        self.small_document_max_bytes = small_document_max_bytes
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self.documents_in_flight = 0
+        self.bytes_in_flight = 0
+        self.small_documents_in_flight = 0
+
+    def is_small_document(self, file_type, size, image_count):
+        """
+        Tells whether a document is extracted through the small-document lane.
+        Documents with images are never small, their images are OCR'd.
+
+        :param file_type: File type of the document
+        :param size: Size of the decoded document in bytes
+        :param image_count: Number of images embedded in the document
+        :return: True for small TXT/DOCX documents without images
+        """
+        return (file_type.upper() in config.SMALL_LANE_FILE_TYPES and size <= self.small_document_max_bytes
+                and image_count == 0)
+
+    def _reject(self, message, status_code):
+        raise AdmissionRejected(message, status_code, self.retry_after)
+
+    @contextmanager
+    def admit(self, file_type, size, image_count):
+        """
+        Admits a document for the duration of the with block.
+
+        :param file_type: File type of the document
+        :param size: Size of the decoded document in bytes
+        :param image_count: Number of images embedded in the document, from the pre-flight inspection
+        :return: Context manager yielding True if the document was admitted through the small-document lane
+        :raises AdmissionRejected: If admitting the document would exceed a limit
+        """
+        small = self.is_small_document(file_type, size, image_count)
+
+        with self._lock:
+            if small:
+                if self.small_lane_max_documents and self.small_documents_in_flight >= self.small_lane_max_documents:
+                    self._reject("Too many small documents in flight", 429)
+                self.small_documents_in_flight += 1
+            else:
+                if self.max_documents and self.documents_in_flight >= self.max_documents:
+                    self._reject("Too many documents in flight", 429)
+
+                # A document larger than the limit is still admitted when nothing else is in flight
+                if self.max_bytes and self.bytes_in_flight and self.bytes_in_flight + size > self.max_bytes:
+                    self._reject("Too many bytes in flight", 429)
+
+                if self.max_ocr_queue_depth and ocr_queue_depth() >= self.max_ocr_queue_depth:
+                    self._reject("OCR queue is full", 503)
+
+                self.documents_in_flight += 1
+                self.bytes_in_flight += size
+
+        try:
+            yield small
+        finally:
+            with self._lock:
+                if small:
+                    self.small_documents_in_flight -= 1
+                else:
+                    self.documents_in_flight -= 1
+                    self.bytes_in_flight -= size
+
+
+admission_controller = AdmissionController(
+    config.ADMISSION_MAX_DOCUMENTS,
+    config.ADMISSION_MAX_BYTES,
+    config.ADMISSION_MAX_OCR_QUEUE_DEPTH,
+    config.SMALL_LANE_MAX_DOCUMENTS,
+    config.SMALL_DOCUMENT_MAX_BYTES,
+    config.ADMISSION_RETRY_AFTER_SECONDS,
+)
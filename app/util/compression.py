@@ -0,0 +1,147 @@
+import gzip
+import io
+import zlib
+
+try:
+    # zstd is optional, gzip is always available
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the installed packages
+    zstandard = None
+
+# Size of the chunks read from compressed request bodies
+READ_CHUNK_SIZE = 64 * 1024
+
+# Errors the decoders raise on corrupt or truncated input
+_DECODE_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+class RequestBodyTooLarge(ValueError):
+    """
+    Raised when a compressed request body decompresses to more than the allowed size.
+    """
+
+
+class CorruptRequestBody(ValueError):
+    """
+    Raised when a compressed request body cannot be decoded.
+    """
+
+
+def supported_encodings():
+    """
+    Returns the content codings the service can decode and encode, in order of preference.
+
+    :return: A list of content coding names
+    """
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def decompress_request_body(stream, content_encoding, max_size):
+    """
+    Decompresses a request body chunk by chunk, stopping as soon as the output
+    exceeds max_size so that a small compressed body cannot expand without bound.
+
+    :param stream: File-like object holding the compressed body
+    :param content_encoding: Value of the Content-Encoding header ("gzip" or "zstd")
+    :param max_size: Maximum size of the decompressed body in bytes
+    :return: The decompressed body
+    :raises RequestBodyTooLarge: If the decompressed body is larger than max_size
+    :raises CorruptRequestBody: If the body is not valid for its content coding
+    :raises ValueError: If the content coding is not supported
+    """
+    content_encoding = content_encoding.strip().lower()
+
+    if content_encoding in {"gzip", "x-gzip"}:
+        reader = gzip.GzipFile(fileobj=stream, mode="rb")
+    elif content_encoding == "zstd" and zstandard is not None:
+        # Bodies compressed in several frames must be read to the end, not only the first frame
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    else:
+        raise ValueError(f"Unsupported Content-Encoding '{content_encoding}', expected one of {', '.join(supported_encodings())}")
+
+    body = io.BytesIO()
+    try:
+        with reader:
+            while True:
+                chunk = reader.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                body.write(chunk)
+                if body.tell() > max_size:
+                    raise RequestBodyTooLarge(f"Decompressed request body exceeds {max_size} bytes")
+    except _DECODE_ERRORS as e:
+        raise CorruptRequestBody(f"Request body is not valid {content_encoding}: {e}")
+
+    return body.getvalue()
+
+
+def choose_response_encoding(accept_encoding):
+    """
+    Picks the content coding of a response from an Accept-Encoding header, honouring q-values.
+
+    :param accept_encoding: Value of the Accept-Encoding header
+    :return: "zstd", "gzip" or None if the response should not be compressed
+    """
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, parameters = item.strip().partition(";")
+        if not coding:
+            continue
+
+        quality = 1.0
+        parameter = parameters.strip()
+        if parameter.startswith("q="):
+            try:
+                quality = float(parameter[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    candidates = [coding for coding in supported_encodings() if accepted.get(coding, accepted.get("*", 0.0)) > 0]
+    if not candidates:
+        return None
+
+    # Prefer the highest q-value, then the service's own order of preference
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)))
+
+
+def compress_body(data, content_encoding, gzip_level, zstd_level):
+    """
+    Compresses a complete response body.
+
+    :param data: Response body bytes
+    :param content_encoding: "gzip" or "zstd"
+    :param gzip_level: Compression level used for gzip
+    :param zstd_level: Compression level used for zstd
+    :return: The compressed body
+    """
+    if content_encoding == "zstd":
+        return zstandard.ZstdCompressor(level=zstd_level).compress(data)
+    return gzip.compress(data, compresslevel=gzip_level)
+
+
+def compress_stream(chunks, content_encoding, gzip_level, zstd_level):
+    """
+    Compresses a streamed response body chunk by chunk.
+
+    :param chunks: Iterable of response body chunks (bytes or str)
+    :param content_encoding: "gzip" or "zstd"
+    :param gzip_level: Compression level used for gzip
+    :param zstd_level: Compression level used for zstd
+    :return: A generator of compressed chunks
+    """
+    if content_encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+    else:
+        # wbits 31 writes a gzip header and trailer
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+
+# Service configuration, read once from the environment at import time.
+# Every setting has a default that keeps the service usable without any configuration.
+
+
+def _env_bool(name, default):
+    """
+    Reads a boolean environment variable ("1", "true", "yes" and "on" are true).
+
+    :param name: Name of the environment variable
+    :param default: Value to return when the variable is not set
+    :return: The boolean value of the variable
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Directory of the per-page result store used for incremental re-extraction
+PAGE_STORE_ENABLED = _env_bool("EXTRACTOR_PAGE_STORE_ENABLED", True)
+PAGE_STORE_DIR = os.environ.get("EXTRACTOR_PAGE_STORE_DIR", os.path.join(tempfile.gettempdir(), "extractor_page_store"))
+# Largest total size of the page store, least recently used entries are evicted beyond it (0 for no limit)
+PAGE_STORE_MAX_BYTES = int(os.environ.get("EXTRACTOR_PAGE_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# OCR profile used when a request does not select one ("fast", "balanced" or "accurate")
+DEFAULT_OCR_PROFILE = os.environ.get("EXTRACTOR_DEFAULT_OCR_PROFILE", "balanced")
+
+# Directories holding the tessdata_fast and tessdata_best model sets, empty to use the installed models
+TESSDATA_FAST_DIR = os.environ.get("EXTRACTOR_TESSDATA_FAST_DIR", "")
+TESSDATA_BEST_DIR = os.environ.get("EXTRACTOR_TESSDATA_BEST_DIR", "")
+
+# Admission control for /extract, a limit of 0 disables it
+ADMISSION_MAX_DOCUMENTS = int(os.environ.get("EXTRACTOR_ADMISSION_MAX_DOCUMENTS", "8"))
+ADMISSION_MAX_BYTES = int(os.environ.get("EXTRACTOR_ADMISSION_MAX_BYTES", str(256 * 1024 * 1024)))
+# Tesseract is CPU bound: beyond two calls (images or tiles) per CPU, more OCR only adds latency
+ADMISSION_MAX_OCR_QUEUE_DEPTH = int(os.environ.get("EXTRACTOR_ADMISSION_MAX_OCR_QUEUE_DEPTH",
+                                                   str(2 * (os.cpu_count() or 1))))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("EXTRACTOR_ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+# Separate lane for small TXT/DOCX documents so they are not queued behind large scans.
+# DOCX documents with embedded images are OCR'd and always go through the main lane.
+SMALL_LANE_FILE_TYPES = {"TXT", "DOCX"}
+SMALL_LANE_MAX_DOCUMENTS = int(os.environ.get("EXTRACTOR_SMALL_LANE_MAX_DOCUMENTS", "8"))
+SMALL_DOCUMENT_MAX_BYTES = int(os.environ.get("EXTRACTOR_SMALL_DOCUMENT_MAX_BYTES", str(1024 * 1024)))
+
+# Page-sharded PDF processing: documents with at least PDF_SHARD_MIN_PAGES pages are split
+# into ranges of PDF_SHARD_PAGES pages extracted by PDF_SHARD_WORKERS processes (0 disables)
+PDF_SHARD_MIN_PAGES = int(os.environ.get("EXTRACTOR_PDF_SHARD_MIN_PAGES", "200"))
+PDF_SHARD_PAGES = int(os.environ.get("EXTRACTOR_PDF_SHARD_PAGES", "100"))
+PDF_SHARD_WORKERS = int(os.environ.get("EXTRACTOR_PDF_SHARD_WORKERS", str(os.cpu_count() or 1)))
+
+# Traffic recording for the load harness: requests are appended to TRAFFIC_RECORD_FILE
+# (disabled when empty). Payloads are only kept when TRAFFIC_PAYLOAD_DIR is set,
+# otherwise a record holds the SHA-256 digest and size of the document only.
+TRAFFIC_RECORD_FILE = os.environ.get("EXTRACTOR_TRAFFIC_RECORD_FILE", "")
+TRAFFIC_PAYLOAD_DIR = os.environ.get("EXTRACTOR_TRAFFIC_PAYLOAD_DIR", "")
+
+# Compressed request and response bodies
+MAX_DECOMPRESSED_REQUEST_BYTES = int(os.environ.get("EXTRACTOR_MAX_DECOMPRESSED_REQUEST_BYTES", str(512 * 1024 * 1024)))
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get("EXTRACTOR_RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.environ.get("EXTRACTOR_RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_ZSTD_LEVEL = int(os.environ.get("EXTRACTOR_RESPONSE_ZSTD_LEVEL", "3"))
+
+# Pre-flight limits checked before a document is parsed, a limit of 0 disables it
+MAX_ZIP_ENTRIES = int(os.environ.get("EXTRACTOR_MAX_ZIP_ENTRIES", "10000"))
+MAX_ZIP_UNCOMPRESSED_BYTES = int(os.environ.get("EXTRACTOR_MAX_ZIP_UNCOMPRESSED_BYTES", str(1024 * 1024 * 1024)))
+MAX_ZIP_COMPRESSION_RATIO = int(os.environ.get("EXTRACTOR_MAX_ZIP_COMPRESSION_RATIO", "100"))
+MAX_PDF_PAGES = int(os.environ.get("EXTRACTOR_MAX_PDF_PAGES", "5000"))
+MAX_PDF_OBJECTS = int(os.environ.get("EXTRACTOR_MAX_PDF_OBJECTS", "2000000"))
+MAX_IMAGE_PIXELS = int(os.environ.get("EXTRACTOR_MAX_IMAGE_PIXELS", str(100 * 1000 * 1000)))
+MAX_TOTAL_IMAGE_PIXELS = int(os.environ.get("EXTRACTOR_MAX_TOTAL_IMAGE_PIXELS", str(2 * 1000 * 1000 * 1000)))
+
+# Shortest-expected-job scheduler in front of extract_information
+SCHEDULER_SLOTS = int(os.environ.get("EXTRACTOR_SCHEDULER_SLOTS", str(os.cpu_count() or 1)))
+# Seconds of estimated cost forgiven per second a job has been waiting, so large jobs are not starved
+SCHEDULER_AGING_RATE = float(os.environ.get("EXTRACTOR_SCHEDULER_AGING_RATE", "1.0"))
+# Weight of a new measurement in the calibrated cost rates (exponential moving average)
+SCHEDULER_CALIBRATION_WEIGHT = float(os.environ.get("EXTRACTOR_SCHEDULER_CALIBRATION_WEIGHT", "0.1"))
+
+# Tiled OCR: images with more pixels than OCR_TILE_MIN_PIXELS are split into horizontal bands
+# of OCR_TILE_BAND_HEIGHT pixels overlapping by OCR_TILE_OVERLAP pixels, OCR'd by OCR_TILE_WORKERS threads.
+# The overlap must be taller than a line of text so that every line is read whole in one band.
+OCR_TILING_ENABLED = _env_bool("EXTRACTOR_OCR_TILING_ENABLED", True)
+OCR_TILE_MIN_PIXELS = int(os.environ.get("EXTRACTOR_OCR_TILE_MIN_PIXELS", str(16 * 1000 * 1000)))
+OCR_TILE_BAND_HEIGHT = int(os.environ.get("EXTRACTOR_OCR_TILE_BAND_HEIGHT", "1200"))
+OCR_TILE_OVERLAP = int(os.environ.get("EXTRACTOR_OCR_TILE_OVERLAP", "120"))
+OCR_TILE_WORKERS = int(os.environ.get("EXTRACTOR_OCR_TILE_WORKERS", str(os.cpu_count() or 1)))
+
+# Tracing: fraction of /extract requests traced (0 disables tracing), exported to TRACING_FILE
+# as OTLP JSON lines, or posted to an OTLP/HTTP collector when TRACING_OTLP_ENDPOINT is set
+TRACING_SAMPLE_RATE = float(os.environ.get("EXTRACTOR_TRACING_SAMPLE_RATE", "0"))
+TRACING_FILE = os.environ.get("EXTRACTOR_TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.environ.get("EXTRACTOR_TRACING_OTLP_ENDPOINT", "")
+TRACING_SERVICE_NAME = os.environ.get("EXTRACTOR_TRACING_SERVICE_NAME", "extractor-service")
+
+# Content store of documents and results keyed by the SHA-256 digest of the document,
+# used by the digest-first /extract/precheck endpoint. Uploaded documents are only kept
+# when CONTENT_STORE_KEEP_DOCUMENTS is set. The least recently used entries are evicted
+# beyond CONTENT_STORE_MAX_BYTES (0 for no limit).
+CONTENT_STORE_ENABLED = _env_bool("EXTRACTOR_CONTENT_STORE_ENABLED", True)
+CONTENT_STORE_DIR = os.environ.get("EXTRACTOR_CONTENT_STORE_DIR", os.path.join(tempfile.gettempdir(), "extractor_content_store"))
+CONTENT_STORE_KEEP_DOCUMENTS = _env_bool("EXTRACTOR_CONTENT_STORE_KEEP_DOCUMENTS", False)
+CONTENT_STORE_MAX_BYTES = int(os.environ.get("EXTRACTOR_CONTENT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Near-duplicate image suppression (off by default): images of at most PHASH_MAX_IMAGE_PIXELS
+# within PHASH_MAX_DISTANCE bits of an image of the same aspect ratio (PHASH_ASPECT_TOLERANCE),
+# seen in at least PHASH_MIN_DOCUMENTS distinct documents, reuse its text ("reuse") or are left out ("skip")
+PHASH_ENABLED = _env_bool("EXTRACTOR_PHASH_ENABLED", False)
+PHASH_MAX_DISTANCE = int(os.environ.get("EXTRACTOR_PHASH_MAX_DISTANCE", "3"))
+PHASH_INDEX_SIZE = int(os.environ.get("EXTRACTOR_PHASH_INDEX_SIZE", "4096"))
+PHASH_MAX_IMAGE_PIXELS = int(os.environ.get("EXTRACTOR_PHASH_MAX_IMAGE_PIXELS", str(256 * 256)))
+PHASH_ASPECT_TOLERANCE = float(os.environ.get("EXTRACTOR_PHASH_ASPECT_TOLERANCE", "0.02"))
+PHASH_MIN_DOCUMENTS = int(os.environ.get("EXTRACTOR_PHASH_MIN_DOCUMENTS", "3"))
+PHASH_MODE = os.environ.get("EXTRACTOR_PHASH_MODE", "reuse")
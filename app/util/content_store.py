@@ -0,0 +1,138 @@
+import hashlib
+import os
+
+from app.util import config
+from app.util.disk_quota import DirectoryQuota, touch
+from app.util.json_util import dumps, loads
+from app.util.tracing import span
+from app.util.util import write_file_atomically
+
+_quota = DirectoryQuota(config.CONTENT_STORE_MAX_BYTES)
+
+
+def compute_document_digest(document_byte_stream):
+    """
+    Computes the digest a document is stored under.
+
+    :param document_byte_stream: Decoded document bytes
+    :return: Hex SHA-256 digest of the document
+    """
+    return hashlib.sha256(document_byte_stream).hexdigest()
+
+
+def result_key(file_type, return_representation, collapse_object, ocr_profile):
+    """
+    Builds the key of a result from the extraction options that change its content.
+
+    :param file_type: File type of the document
+    :param return_representation: Whether the representation was requested
+    :param collapse_object: Whether the collapsed output was requested
+    :param ocr_profile: OcrProfile used for the images
+    :return: The result key
+    """
+    mode = "representation" if return_representation else ("collapse" if collapse_object else "simplified")
+    return f"{file_type}-{mode}-{ocr_profile.name}"
+
+
+def _document_path(digest):
+    return os.path.join(config.CONTENT_STORE_DIR, "documents", digest[:2], digest)
+
+
+def _result_path(digest, key):
+    return os.path.join(config.CONTENT_STORE_DIR, "results", digest[:2], f"{digest}-{key}.json")
+
+
+def has_document(digest):
+    """
+    Tells whether the bytes of a document are stored.
+
+    :param digest: Hex SHA-256 digest of the document
+    :return: True if the document can be read with get_document
+    """
+    return config.CONTENT_STORE_ENABLED and os.path.exists(_document_path(digest))
+
+
+def get_document(digest):
+    """
+    Reads the stored bytes of a document.
+
+    :param digest: Hex SHA-256 digest of the document
+    :return: The document bytes, or None if they are not stored
+    """
+    if not config.CONTENT_STORE_ENABLED:
+        return None
+
+    document_path = _document_path(digest)
+    try:
+        with open(document_path, "rb") as document_file:
+            document_byte_stream = document_file.read()
+    except OSError:
+        return None
+
+    # Reads keep the document from being evicted
+    touch(document_path)
+    return document_byte_stream
+
+
+def put_document(digest, document_byte_stream):
+    """
+    Stores the bytes of a document, if documents are kept (CONTENT_STORE_KEEP_DOCUMENTS).
+    The least recently used entries are evicted once the store exceeds CONTENT_STORE_MAX_BYTES.
+
+    :param digest: Hex SHA-256 digest of the document
+    :param document_byte_stream: Decoded document bytes
+    """
+    if not config.CONTENT_STORE_ENABLED or not config.CONTENT_STORE_KEEP_DOCUMENTS or has_document(digest):
+        return
+
+    try:
+        write_file_atomically(_document_path(digest), document_byte_stream)
+        _quota.record_write(config.CONTENT_STORE_DIR, len(document_byte_stream))
+    except OSError as e:
+        # The store is an optimisation, a failed write must not fail the extraction
+        print(f"Failed to store document {digest}: {e}")
+
+
+def get_result(digest, key):
+    """
+    Reads a stored extraction result.
+
+    :param digest: Hex SHA-256 digest of the document
+    :param key: Result key built by result_key
+    :return: The stored result, or None if it is not stored
+    """
+    if not config.CONTENT_STORE_ENABLED:
+        return None
+
+    result_path = _result_path(digest, key)
+    with span("content_store.get", key=key) as lookup:
+        try:
+            with open(result_path, "rb") as result_file:
+                result = loads(result_file.read())
+        except (OSError, ValueError):
+            result = None
+
+        if result is not None:
+            touch(result_path)
+
+        lookup.set_attribute("hit", result is not None)
+        return result
+
+
+def put_result(digest, key, result):
+    """
+    Stores an extraction result. The least recently used entries are evicted once the store exceeds CONTENT_STORE_MAX_BYTES.
+
+    :param digest: Hex SHA-256 digest of the document
+    :param key: Result key built by result_key
+    :param result: JSON serializable extraction result
+    """
+    if not config.CONTENT_STORE_ENABLED:
+        return
+
+    result_body = dumps(result)
+    try:
+        write_file_atomically(_result_path(digest, key), result_body)
+        _quota.record_write(config.CONTENT_STORE_DIR, len(result_body))
+    except OSError as e:
+        print(f"Failed to store result {digest}/{key}: {e}")
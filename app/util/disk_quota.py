@@ -0,0 +1,85 @@
+import os
+import threading
+
+
+def prune_directory(directory, max_bytes):
+    """
+    Deletes the least recently used files under a directory until the total size
+    of the remaining files is at most max_bytes. Files are ordered by modification
+    time, so readers that want hits to count as use should touch the files they read.
+
+    :param directory: Directory to prune
+    :param max_bytes: Largest total size of the files to keep
+    :return: Total size of the files left in the directory
+    """
+    entries = []
+    total_bytes = 0
+
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed by another process while walking
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total_bytes -= size
+        except OSError:
+            continue
+
+    return total_bytes
+
+
+def touch(path):
+    """
+    Marks a file as recently used for prune_directory. Failures are ignored.
+
+    :param path: Path of the file
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class DirectoryQuota:
+    """
+    Keeps the files under a directory below a size limit. Writes are counted in
+    process, and the directory is pruned whenever a tenth of the limit has been
+    written since the last prune, so the directory is not walked on every write.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: Largest total size of the directory, 0 for no limit
+        """
+        self.max_bytes = max_bytes
+        self._bytes_since_prune = 0
+        self._lock = threading.Lock()
+
+    def record_write(self, directory, size):
+        """
+        Counts a file written to the directory and prunes the directory when it is due.
+
+        :param directory: Directory the file was written to
+        :param size: Size of the file in bytes
+        """
+        if self.max_bytes <= 0:
+            return
+
+        with self._lock:
+            self._bytes_since_prune += size
+            if self._bytes_since_prune < max(self.max_bytes // 10, 1):
+                return
+            self._bytes_since_prune = 0
+
+            prune_directory(directory, self.max_bytes)
@@ -0,0 +1,36 @@
+import json
+
+try:
+    # orjson is several times faster than the standard library encoder and
+    # returns bytes directly, which is what the response body needs anyway
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed packages
+    orjson = None
+
+
+def dumps(obj):
+    """
+    Serializes an object to JSON bytes, using orjson when it is installed
+    and falling back to the standard library json module otherwise.
+
+    :param obj: JSON serializable object (dicts, lists, strings, numbers)
+    :return: UTF-8 encoded JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    # Match orjson's compact output so both paths produce the same bytes
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """
+    Parses JSON from a string or bytes object.
+
+    :param data: JSON document as str or bytes
+    :return: The parsed Python object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
@@ -0,0 +1,258 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pytesseract
+from PIL import Image, ImageOps
+
+from app.util import config
+from app.util.ocr_tiling import lines_from_ocr_data, split_into_bands, stitch_band_lines
+from app.util.page_store import record_reused_units
+from app.util.perceptual_hash import find_known_image, is_available, remember_image
+from app.util.preflight import check_image_header
+from app.util.tracing import propagate, span
+
+# Longest image side kept by the "light" preprocessing, larger images are downscaled
+LIGHT_MAX_IMAGE_SIDE = 2000
+
+# Shortest image side below which the "full" preprocessing upscales the image
+FULL_MIN_IMAGE_SIDE = 1000
+
+# Start of the text reported in place of an image whose OCR failed
+OCR_ERROR_PREFIX = "An error occurred while performing OCR: "
+
+# Number of OCR calls waiting for or running in tesseract, read by admission control
+_ocr_queue_depth = 0
+_ocr_queue_lock = threading.Lock()
+
+# Threads running the bands of tiled images, tesseract runs in a subprocess so threads run in parallel
+_tile_executor = None
+_tile_executor_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class OcrProfile:
+    """
+    Tesseract configuration used for a request.
+
+    Attributes:
+        name: Name of the profile, part of every cache key holding OCR results
+        engine_mode: Tesseract OCR engine mode (--oem)
+        page_segmentation_mode: Tesseract page segmentation mode (--psm)
+        tessdata_dir: Directory of the model set to use, empty for the installed models
+        preprocessing: Image preprocessing level ("none", "light" or "full")
+    """
+
+    name: str
+    engine_mode: int
+    page_segmentation_mode: int
+    tessdata_dir: str
+    preprocessing: str
+
+    def tesseract_config(self):
+        """
+        Builds the tesseract command line options of the profile.
+
+        :return: The config string passed to pytesseract
+        """
+        options = f"--oem {self.engine_mode} --psm {self.page_segmentation_mode}"
+        if self.tessdata_dir:
+            options += f' --tessdata-dir "{self.tessdata_dir}"'
+        return options
+
+
+OCR_PROFILES = {
+    # LSTM only with the fast models, a single text block and downscaled grayscale input
+    "fast": OcrProfile("fast", 1, 6, config.TESSDATA_FAST_DIR, "light"),
+    # Tesseract's default configuration
+    "balanced": OcrProfile("balanced", 3, 3, "", "none"),
+    # LSTM only with the best models, full page layout analysis and contrast-normalised input
+    "accurate": OcrProfile("accurate", 1, 3, config.TESSDATA_BEST_DIR, "full"),
+}
+
+
+def get_ocr_profile(name=None):
+    """
+    Returns the OCR profile with the given name.
+
+    :param name: Name of the profile, None for the configured default
+    :return: The OcrProfile
+    :raises ValueError: If no profile has that name
+    """
+    profile = OCR_PROFILES.get((name or config.DEFAULT_OCR_PROFILE).lower())
+    if profile is None:
+        raise ValueError(f"'ocr_profile' must be one of {', '.join(OCR_PROFILES)}")
+    return profile
+
+
+def preprocess_image(image, preprocessing):
+    """
+    Prepares an image for OCR according to a preprocessing level.
+
+    :param image: PIL image
+    :param preprocessing: "none", "light" or "full"
+    :return: The preprocessed PIL image
+    """
+    if preprocessing == "none":
+        return image
+
+    # Tesseract binarises internally, grayscale input saves it the colour conversion
+    image = image.convert("L")
+
+    if preprocessing == "light":
+        # Large scans do not need their full resolution for bulk indexing
+        if max(image.size) > LIGHT_MAX_IMAGE_SIDE:
+            image.thumbnail((LIGHT_MAX_IMAGE_SIDE, LIGHT_MAX_IMAGE_SIDE))
+        return image
+
+    # Small images have glyphs below the size tesseract is trained on. A long thin image can have
+    # a short side and still be huge, so it is only upscaled while it stays within the pixel limit.
+    if (min(image.size) < FULL_MIN_IMAGE_SIDE
+            and (not config.MAX_IMAGE_PIXELS or image.width * image.height * 4 <= config.MAX_IMAGE_PIXELS)):
+        image = image.resize((image.width * 2, image.height * 2), Image.LANCZOS)
+
+    return ImageOps.autocontrast(image)
+
+
+def is_ocr_error(text):
+    """
+    Tells whether the text of an image reports an OCR failure instead of the image content.
+    Such text must not be stored, the failure may be transient.
+
+    :param text: Text reported for an image
+    :return: True if the OCR of the image failed
+    """
+    return isinstance(text, str) and text.startswith(OCR_ERROR_PREFIX)
+
+
+def ocr_queue_depth():
+    """
+    Returns the number of OCR calls currently waiting for or running in tesseract.
+
+    :return: The OCR queue depth
+    """
+    return _ocr_queue_depth
+
+
+def _update_ocr_queue_depth(delta):
+    global _ocr_queue_depth
+    with _ocr_queue_lock:
+        _ocr_queue_depth += delta
+
+
+def _get_tile_executor():
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is None:
+            _tile_executor = ThreadPoolExecutor(max_workers=max(config.OCR_TILE_WORKERS, 1),
+                                                thread_name_prefix="ocr-tile")
+        return _tile_executor
+
+
+def should_tile(image):
+    """
+    Tells whether an image is large enough to be OCR'd in bands.
+
+    :param image: PIL image, after preprocessing
+    :return: True if the image should be tiled
+    """
+    return (config.OCR_TILING_ENABLED
+            and image.width * image.height > config.OCR_TILE_MIN_PIXELS
+            and image.height > config.OCR_TILE_BAND_HEIGHT)
+
+
+def _run_tesseract(image, profile, queued_at=None, as_lines=False):
+    """
+    Runs tesseract on an image, counting the call in the OCR queue depth until it completes.
+
+    :param image: PIL image
+    :param profile: OcrProfile to use
+    :param queued_at: time.perf_counter() value when the call was queued, None if it was not queued
+    :param as_lines: Whether to return OcrLine objects with their positions instead of the text
+    """
+    queue_wait_ms = (time.perf_counter() - queued_at) * 1000 if queued_at is not None else 0.0
+    try:
+        with span("tesseract", width=image.width, height=image.height, queue_wait_ms=queue_wait_ms):
+            if as_lines:
+                return lines_from_ocr_data(pytesseract.image_to_data(image, config=profile.tesseract_config(),
+                                                                     output_type=pytesseract.Output.DICT))
+            return pytesseract.image_to_string(image, config=profile.tesseract_config())
+    finally:
+        _update_ocr_queue_depth(-1)
+
+
+def _ocr_tiled_image(image, profile):
+    """
+    OCRs an image as overlapping horizontal bands in parallel and stitches the text back together
+    from the positions of the recognised lines.
+
+    :param image: PIL image, after preprocessing
+    :param profile: OcrProfile to use
+    :return: Extracted text from the image
+    """
+    bands = split_into_bands(image.height, config.OCR_TILE_BAND_HEIGHT, config.OCR_TILE_OVERLAP)
+
+    # Crop every band up front, PIL crops of a loaded image are cheap copies
+    image.load()
+    executor = _get_tile_executor()
+    futures = []
+    for top, bottom in bands:
+        _update_ocr_queue_depth(1)
+        futures.append(executor.submit(propagate(_run_tesseract), image.crop((0, top, image.width, bottom)), profile,
+                                       time.perf_counter(), True))
+
+    return stitch_band_lines(bands, [future.result() for future in futures])
+
+
+def ocr_image(image, ocr_profile=None):
+    """
+    Performs OCR on a PIL image with an OCR profile.
+    When enabled, small images already seen in several other documents (logos, footers) reuse
+    their text instead of being OCR'd. Images over the tiling threshold are OCR'd as overlapping
+    bands in parallel.
+
+    :param image: PIL image
+    :param ocr_profile: OcrProfile to use, None for the configured default
+    :return: Extracted text from the image
+    """
+    profile = ocr_profile or get_ocr_profile()
+
+    with span("ocr", profile=profile.name, width=image.width, height=image.height) as ocr_span:
+        image_key = None
+        if is_available():
+            image_key, known_text = find_known_image(image, profile.name)
+            if known_text is not None:
+                ocr_span.set_attribute("boilerplate", True)
+                record_reused_units("image", 1)
+                return known_text
+
+        image = preprocess_image(image, profile.preprocessing)
+
+        if should_tile(image):
+            ocr_span.set_attribute("tiled", True)
+            extracted_text = _ocr_tiled_image(image, profile)
+        else:
+            _update_ocr_queue_depth(1)
+            extracted_text = _run_tesseract(image, profile)
+
+        if image_key is not None:
+            remember_image(image_key, profile.name, extracted_text)
+
+        return extracted_text
+
+
+def ocr_image_byte_stream(image_byte_stream, ocr_profile=None):
+    """
+    Performs OCR on an image byte stream with an OCR profile.
+
+    :param image_byte_stream: Byte stream of the image
+    :param ocr_profile: OcrProfile to use, None for the configured default
+    :return: Extracted text from the image
+    :raises DocumentRejected: If the image header declares too many pixels
+    """
+    # Check the declared dimensions before the pixel data is decoded
+    check_image_header(image_byte_stream)
+
+    return ocr_image(Image.open(io.BytesIO(image_byte_stream)), ocr_profile)
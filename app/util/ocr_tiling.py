@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class OcrLine:
+    """
+    A line of text recognised in a band, with its vertical extent in band pixel rows.
+
+    Attributes:
+        top: First pixel row of the line box
+        bottom: Pixel row after the last row of the line box
+        text: Words of the line joined by spaces
+    """
+
+    top: int
+    bottom: int
+    text: str
+
+
+def split_into_bands(height, band_height, overlap):
+    """
+    Splits an image height into overlapping horizontal bands.
+
+    :param height: Height of the image in pixels
+    :param band_height: Height of each band in pixels
+    :param overlap: Number of pixels shared by consecutive bands
+    :return: A list of (top, bottom) pixel rows, bottom excluded
+    """
+    step = max(band_height - overlap, 1)
+    bands = []
+
+    for top in range(0, height, step):
+        bottom = top + band_height
+
+        # Extend the last band instead of leaving a sliver that lies within the overlap
+        if height - bottom <= overlap:
+            bottom = height
+
+        bands.append((top, bottom))
+        if bottom == height:
+            break
+
+    return bands
+
+
+def lines_from_ocr_data(data):
+    """
+    Groups the words of a pytesseract.image_to_data result into lines, in reading order.
+
+    :param data: Output of image_to_data with output_type=Output.DICT
+    :return: A list of OcrLine objects in band pixel rows
+    """
+    lines = {}
+
+    for index, word in enumerate(data["text"]):
+        if data["level"][index] != 5 or not word.strip():
+            continue
+
+        key = (data["page_num"][index], data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        top = data["top"][index]
+        bottom = top + data["height"][index]
+
+        # Dictionaries keep insertion order, which is tesseract's reading order
+        line = lines.get(key)
+        if line is None:
+            lines[key] = [top, bottom, [word]]
+        else:
+            line[0] = min(line[0], top)
+            line[1] = max(line[1], bottom)
+            line[2].append(word)
+
+    return [OcrLine(top, bottom, " ".join(words)) for top, bottom, words in lines.values()]
+
+
+def stitch_band_lines(bands, band_lines):
+    """
+    Joins the lines of consecutive bands in reading order, keeping every line exactly once.
+
+    Each overlap is cut in the middle, and a line belongs to the band whose share of the
+    image contains the vertical centre of its box. A line read in both bands has the
+    same centre in both and is kept once. A line cut by a band edge is only partly visible
+    in one band. Its partial box lies beyond the cut, so only the complete reading is kept,
+    as long as lines are shorter than the overlap. The decision uses positions only,
+    never the text, so repeated or similar rows (table cells, list items) are all kept.
+
+    :param bands: (top, bottom) pixel rows of each band, as returned by split_into_bands
+    :param band_lines: OcrLine objects of each band, top to bottom
+    :return: The text of the whole image
+    """
+    cuts = [(next_top + bottom) / 2 for (_, bottom), (next_top, _) in zip(bands, bands[1:])]
+    stitched_lines = []
+
+    for index, ((band_top, _), lines) in enumerate(zip(bands, band_lines)):
+        upper = cuts[index - 1] if index > 0 else float("-inf")
+        lower = cuts[index] if index < len(cuts) else float("inf")
+
+        for line in lines:
+            centre = band_top + (line.top + line.bottom) / 2
+            if upper <= centre < lower:
+                stitched_lines.append(line.text)
+
+    return "\n".join(stitched_lines)
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """
+    Extraction result for a single page (PDF page, DOCX paragraph, PPTX slide or TXT document).
+
+    Attributes:
+        number: 1-based page number
+        text: Text extracted from the page, None if the extractor did not report the page
+        images: OCR text of each image on the page, None if the extractor did not report the page
+        links: [link text, URL] pairs of the hyperlinks on the page, None if links were not extracted
+    """
+
+    number: int
+    text: Optional[str] = None
+    images: Optional[List[str]] = None
+    links: Optional[List[List[str]]] = None
+
+
+def build_page_records(page_text_dict=None, page_image_dict=None, page_link_dict=None):
+    """
+    Merges the per-page dictionaries returned by the extractors into a list of
+    page records ordered by page number.
+
+    :param page_text_dict: A dictionary where keys are page numbers (int or str) and values are strings
+    :param page_image_dict: A dictionary where keys are page numbers (int or str) and values are lists of strings
+    :param page_link_dict: A dictionary where keys are page numbers (int or str) and values are lists of (link text, link) tuples
+    :return: A list of PageRecord objects sorted by page number
+    :raises ValueError: If an extractor returned an error message instead of a dictionary
+    """
+    records: Dict[int, PageRecord] = {}
+
+    for section in (page_text_dict, page_image_dict, page_link_dict):
+        # Extractors report failures as strings, surface them as errors here
+        if isinstance(section, str):
+            raise ValueError(section)
+
+    if page_text_dict:
+        for page, text in page_text_dict.items():
+            records[int(page)] = PageRecord(int(page), text=text)
+
+    if page_image_dict:
+        for page, images in page_image_dict.items():
+            record = records.get(int(page))
+            if record is None:
+                record = records[int(page)] = PageRecord(int(page))
+            # Keep the response JSON-serializable if an extractor reports raw image bytes
+            record.images = [image if isinstance(image, str) else str(image) for image in images]
+
+    if page_link_dict:
+        for page, links in page_link_dict.items():
+            record = records.get(int(page))
+            if record is None:
+                record = records[int(page)] = PageRecord(int(page))
+            record.links = [[link_text, link] for link_text, link in links]
+
+    return [records[page] for page in sorted(records)]
+
+
+def render_page_records(records, sections, return_representation=False, collapse_object=False):
+    """
+    Renders page records into the 'data' value of the /extract response in a single pass.
+
+    - Representation mode returns one object per section, e.g.
+      {"image": {"1": [...]}, "text": {"1": "..."}, "link": {"1": [[text, url]]}},
+      with sections in the given order.
+    - Simplified mode returns {"1": "<image text> <page text>", ...}.
+    - Collapsed mode joins the simplified page strings into a single string.
+
+    :param records: List of PageRecord objects sorted by page number
+    :param sections: Ordered list of section names present for this file type ("text", "image", "link")
+    :param return_representation: Whether to return the full per-section representation
+    :param collapse_object: Whether to collapse the simplified output into one string
+    :return: The rendered 'data' value (dict or str)
+    """
+    if return_representation:
+        rendered: Dict[str, Dict[str, object]] = {section: {} for section in sections}
+        text_section: Optional[dict] = rendered.get("text")
+        image_section: Optional[dict] = rendered.get("image")
+        link_section: Optional[dict] = rendered.get("link")
+
+        for record in records:
+            key = str(record.number)
+            if text_section is not None and record.text is not None:
+                text_section[key] = record.text
+            if image_section is not None and record.images is not None:
+                image_section[key] = record.images
+            if link_section is not None and record.links is not None:
+                link_section[key] = record.links
+
+        return rendered
+
+    # Combine the image text and page text of every page, links are only part of the representation
+    combined = [
+        (str(record.number), f"{' '.join(record.images or ())} {record.text or ''}".strip())
+        for record in records
+    ]
+
+    if collapse_object:
+        return " ".join(value for _, value in combined)
+
+    return dict(combined)
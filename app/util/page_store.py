@@ -0,0 +1,124 @@
+import contextvars
+import hashlib
+import os
+from contextlib import contextmanager
+
+from app.util import config
+from app.util.disk_quota import DirectoryQuota, touch
+from app.util.json_util import dumps, loads
+from app.util.tracing import span
+from app.util.util import write_file_atomically
+
+_quota = DirectoryQuota(config.PAGE_STORE_MAX_BYTES)
+
+# Units of work of the current extraction answered without extracting them, by stage
+_reused_units = contextvars.ContextVar("reused_units", default=None)
+
+
+@contextmanager
+def count_reused_units(counts):
+    """
+    Counts the pages and images answered from the page store or the boilerplate index
+    in the with block, so that cost calibration only considers work that was done.
+
+    :param counts: Dictionary filled with stage name ("text" or "image") to units reused
+    """
+    token = _reused_units.set(counts)
+    try:
+        yield counts
+    finally:
+        _reused_units.reset(token)
+
+
+def record_reused_units(stage, units):
+    """
+    Adds reused units of a stage to the current count_reused_units block, if any.
+
+    :param stage: Stage name ("text" or "image")
+    :param units: Number of pages (text) or images (image) reused
+    """
+    counts = _reused_units.get()
+    if counts is not None and units:
+        counts[stage] = counts.get(stage, 0) + units
+
+
+def fingerprint(*parts):
+    """
+    Computes a SHA-256 fingerprint over a sequence of byte strings.
+    Each part is length-prefixed so that different splits of the same bytes do not collide.
+
+    :param parts: Byte strings (or str, encoded as UTF-8) describing the page content
+    :return: Hex digest of the fingerprint
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _entry_path(namespace, page_fingerprint):
+    """
+    Returns the file path of a stored page result. Entries are sharded into
+    sub-directories by the first two hex characters of the fingerprint.
+
+    :param namespace: Name of the extractor the result belongs to, e.g. "pdf-text"
+    :param page_fingerprint: Hex fingerprint of the page
+    :return: Path of the entry file
+    """
+    return os.path.join(config.PAGE_STORE_DIR, namespace, page_fingerprint[:2], f"{page_fingerprint}.json")
+
+
+def get_page_result(namespace, page_fingerprint):
+    """
+    Looks up a stored page result.
+
+    :param namespace: Name of the extractor the result belongs to, e.g. "pdf-text"
+    :param page_fingerprint: Hex fingerprint of the page
+    :return: The stored result, or None if the page has not been extracted before
+    """
+    if not config.PAGE_STORE_ENABLED:
+        return None
+
+    entry_path = _entry_path(namespace, page_fingerprint)
+    with span("page_store.get", namespace=namespace) as lookup:
+        try:
+            with open(entry_path, "rb") as entry_file:
+                result = loads(entry_file.read())
+        except (OSError, ValueError):
+            # Missing or unreadable entries are treated as a miss
+            result = None
+
+        # Hits keep the entry from being evicted
+        if result is not None:
+            touch(entry_path)
+
+            # Namespaces are "<file type>-text" (one page) or "<file type>-image-<profile>" (a list of images)
+            stage = namespace.split("-")[1]
+            record_reused_units(stage, len(result) if stage == "image" else 1)
+
+        lookup.set_attribute("hit", result is not None)
+        return result
+
+
+def put_page_result(namespace, page_fingerprint, result):
+    """
+    Stores a page result. The entry is written atomically so that concurrent readers never see a partial entry.
+    The least recently used entries are evicted once the store exceeds PAGE_STORE_MAX_BYTES.
+
+    :param namespace: Name of the extractor the result belongs to, e.g. "pdf-text"
+    :param page_fingerprint: Hex fingerprint of the page
+    :param result: JSON serializable extraction result of the page
+    """
+    if not config.PAGE_STORE_ENABLED:
+        return
+
+    entry = dumps(result)
+    try:
+        write_file_atomically(_entry_path(namespace, page_fingerprint), entry)
+        _quota.record_write(config.PAGE_STORE_DIR, len(entry))
+    except OSError as e:
+        # The store is an optimisation, a failed write must not fail the extraction
+        print(f"Failed to store page result {namespace}/{page_fingerprint}: {e}")
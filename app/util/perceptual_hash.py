@@ -0,0 +1,256 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+
+from app.util import config
+
+try:
+    # numpy vectorises the downsampling, the DCT and the Hamming distance scan
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the installed packages
+    np = None
+
+# Side of the grayscale thumbnail the DCT is computed on
+HASH_IMAGE_SIDE = 32
+
+# Side of the block of low-frequency DCT coefficients kept in the hash (8 x 8 = 64 bits)
+HASH_DCT_SIDE = 8
+
+# Digest of the document whose images are being OCR'd, set by the extraction
+_current_document = contextvars.ContextVar("current_document", default=None)
+
+
+def _dct_matrix(size):
+    """
+    Builds the orthonormal DCT-II matrix, so that D @ x @ D.T is the 2D DCT of x.
+    """
+    k = np.arange(size).reshape(-1, 1)
+    n = np.arange(size).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0, :] = np.sqrt(1.0 / size)
+    return matrix
+
+
+_DCT = _dct_matrix(HASH_IMAGE_SIDE) if np is not None else None
+
+# Weights of the 64 hash bits, most significant first
+_BIT_WEIGHTS = (np.uint64(1) << np.arange(63, -1, -1, dtype=np.uint64)) if np is not None else None
+
+
+def is_available():
+    """
+    Tells whether near-duplicate suppression can run (it needs numpy) and is enabled.
+    """
+    return np is not None and config.PHASH_ENABLED
+
+
+@contextmanager
+def document_scope(digest):
+    """
+    Marks the images OCR'd in the with block as belonging to a document. Images are
+    only recognised as boilerplate after they were seen in several distinct documents.
+
+    :param digest: Digest of the document
+    """
+    token = _current_document.set(digest)
+    try:
+        yield
+    finally:
+        _current_document.reset(token)
+
+
+def _downsample(image):
+    """
+    Converts an image to a 32 x 32 grayscale array by averaging pixel blocks.
+
+    :param image: PIL image
+    :return: A float32 numpy array of shape (32, 32)
+    """
+    gray = image.convert("L")
+
+    # Let PIL shrink large images by an integer factor first, which is a cheap box filter
+    factor = min(gray.width, gray.height) // (HASH_IMAGE_SIDE * 4)
+    if factor > 1:
+        gray = gray.reduce(factor)
+
+    # Scale the whole image to 4 x 4 pixels per thumbnail pixel, then average each block
+    gray = gray.resize((HASH_IMAGE_SIDE * 4, HASH_IMAGE_SIDE * 4), Image.BOX)
+    pixels = np.asarray(gray, dtype=np.float32)
+    return pixels.reshape(HASH_IMAGE_SIDE, 4, HASH_IMAGE_SIDE, 4).mean(axis=(1, 3))
+
+
+def perceptual_hash(image):
+    """
+    Computes the 64-bit DCT perceptual hash of an image. Re-encoded or rescaled
+    copies of an image have hashes a few bits apart.
+
+    :param image: PIL image
+    :return: The hash as a Python int
+    """
+    coefficients = (_DCT @ _downsample(image) @ _DCT.T)[:HASH_DCT_SIDE, :HASH_DCT_SIDE].flatten()
+
+    # Compare with the median of the AC coefficients, the DC term only reflects overall brightness
+    bits = coefficients > np.median(coefficients[1:])
+    return int(np.sum(_BIT_WEIGHTS[bits]))
+
+
+class BoilerplateIndex:
+    """
+    Bounded index of the OCR text of recently seen images, searched by Hamming distance
+    between perceptual hashes among images of the same aspect ratio. Each entry records
+    the distinct documents the image was seen in. The least recently used entry is evicted
+    when the index is full.
+    """
+
+    def __init__(self, capacity, max_distance, aspect_tolerance, min_documents):
+        """
+        :param capacity: Number of images kept in the index
+        :param max_distance: Largest Hamming distance considered the same image
+        :param aspect_tolerance: Largest relative difference of aspect ratios considered the same image
+        :param min_documents: Number of distinct documents an image must be seen in to be reused
+        """
+        self.capacity = max(capacity, 1)
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self.min_documents = max(min_documents, 1)
+
+        self._hashes = np.zeros(self.capacity, dtype=np.uint64)
+        self._aspects = np.ones(self.capacity, dtype=np.float64)
+        self._used = np.zeros(self.capacity, dtype=bool)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._documents = [set() for _ in range(self.capacity)]
+        self._texts = [None] * self.capacity
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def _match(self, image_hash, aspect):
+        """
+        Returns the slot of the closest stored image with the same aspect ratio within
+        max_distance, or None. Called with the lock held.
+        """
+        candidates = self._used & (np.abs(self._aspects / aspect - 1.0) <= self.aspect_tolerance)
+        if not candidates.any():
+            return None
+
+        # XOR against every stored hash and count the differing bits at once
+        differences = np.bitwise_xor(self._hashes, np.uint64(image_hash))
+        distances = np.unpackbits(differences.view(np.uint8)).reshape(self.capacity, 64).sum(axis=1)
+        distances[~candidates] = 65
+
+        slot = int(np.argmin(distances))
+        return slot if distances[slot] <= self.max_distance else None
+
+    def lookup(self, image_hash, aspect, document):
+        """
+        Finds a stored image matching a hash and records that it was seen in a document.
+
+        :param image_hash: Perceptual hash of the image
+        :param aspect: Width divided by height of the image
+        :param document: Digest of the document the image belongs to
+        :return: The stored text if the image was seen in at least min_documents distinct
+                 documents, counting this one, otherwise None
+        """
+        with self._lock:
+            slot = self._match(image_hash, aspect)
+            if slot is None:
+                return None
+
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+            # Only min_documents digests are needed to tell whether the image is boilerplate
+            documents = self._documents[slot]
+            if len(documents) < self.min_documents:
+                documents.add(document)
+
+            return self._texts[slot] if len(documents) >= self.min_documents else None
+
+    def add(self, image_hash, aspect, document, text):
+        """
+        Stores the OCR text of an image, evicting the least recently used entry if the index is full.
+        An image that is already indexed only has its text updated.
+
+        :param image_hash: Perceptual hash of the image
+        :param aspect: Width divided by height of the image
+        :param document: Digest of the document the image belongs to
+        :param text: OCR text of the image
+        """
+        with self._lock:
+            slot = self._match(image_hash, aspect)
+            if slot is not None:
+                self._texts[slot] = text
+                return
+
+            free_slots = np.flatnonzero(~self._used)
+            slot = int(free_slots[0]) if len(free_slots) else int(np.argmin(self._last_used))
+
+            self._clock += 1
+            self._hashes[slot] = np.uint64(image_hash)
+            self._aspects[slot] = aspect
+            self._used[slot] = True
+            self._last_used[slot] = self._clock
+            self._documents[slot] = {document}
+            self._texts[slot] = text
+
+
+# One index per OCR profile, since the stored text depends on the profile
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_index(profile_name):
+    with _indexes_lock:
+        index = _indexes.get(profile_name)
+        if index is None:
+            index = _indexes[profile_name] = BoilerplateIndex(config.PHASH_INDEX_SIZE, config.PHASH_MAX_DISTANCE,
+                                                              config.PHASH_ASPECT_TOLERANCE,
+                                                              config.PHASH_MIN_DOCUMENTS)
+        return index
+
+
+def is_candidate(image):
+    """
+    Tells whether an image may be boilerplate: logos, icons and footers are small.
+    Page scans are never candidates, scans of different pages with the same layout
+    have close hashes.
+
+    :param image: PIL image, before preprocessing
+    :return: True if the image is small enough to be looked up
+    """
+    return 0 < image.width * image.height <= config.PHASH_MAX_IMAGE_PIXELS
+
+
+def find_known_image(image, profile_name):
+    """
+    Looks an image up in the boilerplate index of an OCR profile. Only small images
+    OCR'd within a document_scope are looked up.
+
+    :param image: PIL image, before preprocessing
+    :param profile_name: Name of the OCR profile
+    :return: A tuple (key, text): key is passed to remember_image after OCR, None if the
+             image is not indexed. text is the OCR text to use for the image ("" in skip mode),
+             or None if the image has to be OCR'd
+    """
+    document = _current_document.get()
+    if document is None or not is_candidate(image):
+        return None, None
+
+    image_key = (perceptual_hash(image), image.width / image.height, document)
+    text = _get_index(profile_name).lookup(*image_key)
+    if text is None:
+        return image_key, None
+
+    return image_key, ("" if config.PHASH_MODE == "skip" else text)
+
+
+def remember_image(image_key, profile_name, text):
+    """
+    Adds the OCR text of an image to the boilerplate index of an OCR profile.
+
+    :param image_key: Key returned by find_known_image
+    :param profile_name: Name of the OCR profile
+    :param text: OCR text of the image
+    """
+    _get_index(profile_name).add(*image_key, text)
@@ -0,0 +1,198 @@
+import io
+import posixpath
+import zipfile
+import zlib
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from app.util import config
+
+# Compression ratios are only checked for entries larger than this, small XML parts compress very well
+ZIP_RATIO_MIN_ENTRY_BYTES = 1024 * 1024
+
+# Bytes read from the start of an embedded image to parse its header
+IMAGE_HEADER_BYTES = 64 * 1024
+
+# Extensions of the media parts of DOCX and PPTX packages that are OCR'd
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+class DocumentRejected(ValueError):
+    """
+    Raised when a document exceeds a pre-flight limit and must not be parsed.
+    """
+
+
+class MalformedDocument(ValueError):
+    """
+    Raised when a document is not a valid file of its declared type.
+    """
+
+
+@dataclass(slots=True)
+class DocumentInspection:
+    """
+    Cheap facts about a document, gathered without parsing or decoding its content.
+
+    Attributes:
+        file_type: File type of the document
+        size: Size of the document in bytes
+        page_count: Number of PDF pages or PPTX slides, 0 when unknown
+        object_count: Number of PDF objects or zip entries
+        uncompressed_size: Declared uncompressed size of all zip entries
+        image_count: Number of embedded images
+        image_pixels: Declared pixel count of all embedded images
+    """
+
+    file_type: str
+    size: int
+    page_count: int = 0
+    object_count: int = 0
+    uncompressed_size: int = 0
+    image_count: int = 0
+    image_pixels: int = 0
+
+
+def _check_limit(value, limit, message):
+    if limit and value > limit:
+        raise DocumentRejected(f"{message} ({value} > {limit})")
+
+
+def check_image_dimensions(width, height):
+    """
+    Rejects images whose declared dimensions exceed the pixel limit.
+
+    :param width: Declared width in pixels
+    :param height: Declared height in pixels
+    :return: The pixel count of the image
+    :raises DocumentRejected: If the image has too many pixels
+    """
+    pixels = width * height
+    _check_limit(pixels, config.MAX_IMAGE_PIXELS, "Image has too many pixels")
+    return pixels
+
+
+def check_image_header(image_byte_stream):
+    """
+    Reads only the header of an image to check its dimensions before it is decoded.
+
+    :param image_byte_stream: Byte stream (or the first bytes) of the image
+    :return: The pixel count of the image, 0 if the header cannot be parsed
+    :raises DocumentRejected: If the image has too many pixels
+    """
+    try:
+        # Image.open parses the header only, pixel data is decoded lazily
+        with Image.open(io.BytesIO(image_byte_stream)) as image:
+            width, height = image.size
+    except Image.DecompressionBombError as e:
+        # PIL refuses to open images far above its own limit, they could not be OCR'd either
+        raise DocumentRejected(f"Image has too many pixels: {e}")
+    except Exception:
+        # Unknown or truncated headers are left to the OCR step to report
+        return 0
+
+    return check_image_dimensions(width, height)
+
+
+def _inspect_zip(inspection, byte_stream):
+    """
+    Inspects a DOCX/PPTX package from its central directory and its image headers.
+    """
+    try:
+        package = zipfile.ZipFile(io.BytesIO(byte_stream))
+    except zipfile.BadZipFile as e:
+        raise MalformedDocument(f"Document is not a valid {inspection.file_type} package: {e}")
+
+    with package:
+        entries = package.infolist()
+        _check_limit(len(entries), config.MAX_ZIP_ENTRIES, "Too many entries in package")
+        inspection.object_count = len(entries)
+
+        for entry in entries:
+            inspection.uncompressed_size += entry.file_size
+
+            # A high ratio on a large entry is the signature of a zip bomb
+            if entry.file_size > ZIP_RATIO_MIN_ENTRY_BYTES:
+                ratio = entry.file_size // max(entry.compress_size, 1)
+                _check_limit(ratio, config.MAX_ZIP_COMPRESSION_RATIO, f"Entry '{entry.filename}' is compressed too well")
+
+            if entry.filename.startswith("ppt/slides/slide") and entry.filename.endswith(".xml"):
+                inspection.page_count += 1
+
+        _check_limit(inspection.uncompressed_size, config.MAX_ZIP_UNCOMPRESSED_BYTES, "Package is too large when uncompressed")
+
+        # Only the first bytes of each image are read to get its dimensions
+        for entry in entries:
+            if posixpath.splitext(entry.filename)[1].lower() in IMAGE_EXTENSIONS:
+                try:
+                    with package.open(entry) as image_file:
+                        image_header = image_file.read(IMAGE_HEADER_BYTES)
+                except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as e:
+                    # Corrupt, encrypted or unsupported entries
+                    raise MalformedDocument(f"Entry '{entry.filename}' cannot be read: {e}")
+
+                inspection.image_count += 1
+                inspection.image_pixels += check_image_header(image_header)
+
+
+def _pdf_integer(pdf_document, xref, key):
+    value_type, value = pdf_document.xref_get_key(xref, key)
+    return int(float(value)) if value_type in {"int", "float"} else 0
+
+
+def _inspect_pdf(inspection, byte_stream):
+    """
+    Inspects a PDF from its cross-reference table and the declared size of its images.
+    """
+    try:
+        pdf_document = fitz.open(stream=byte_stream, filetype="pdf")
+    except Exception as e:
+        raise MalformedDocument(f"Document is not a valid PDF: {e}")
+
+    try:
+        inspection.page_count = len(pdf_document)
+        inspection.object_count = pdf_document.xref_length()
+        _check_limit(inspection.page_count, config.MAX_PDF_PAGES, "Too many pages")
+        _check_limit(inspection.object_count, config.MAX_PDF_OBJECTS, "Too many objects")
+
+        # Image XObjects are found in the cross-reference table without loading any page.
+        # Their dictionaries hold the declared width and height, the image itself is not decoded.
+        for xref in range(1, inspection.object_count):
+            try:
+                if pdf_document.xref_get_key(xref, "Subtype") != ("name", "/Image"):
+                    continue
+                width = _pdf_integer(pdf_document, xref, "Width")
+                height = _pdf_integer(pdf_document, xref, "Height")
+            except (RuntimeError, ValueError) as e:
+                raise MalformedDocument(f"Document is not a valid PDF: object {xref}: {e}")
+
+            inspection.image_count += 1
+            inspection.image_pixels += check_image_dimensions(width, height)
+    finally:
+        pdf_document.close()
+
+
+def inspect_document(file_type, byte_stream):
+    """
+    Inspects a document before it is parsed and rejects it if it exceeds a configured limit.
+    Only metadata is read: the zip central directory and image headers of DOCX/PPTX,
+    the cross-reference table and image dictionaries of PDFs. No PDF page is loaded.
+
+    :param file_type: File type of the document ("PDF", "DOCX", "PPTX" or "TXT")
+    :param byte_stream: Decoded document bytes
+    :return: A DocumentInspection with the facts gathered
+    :raises DocumentRejected: If the document exceeds a limit
+    :raises MalformedDocument: If the document is not a valid file of its type
+    """
+    inspection = DocumentInspection(file_type=file_type, size=len(byte_stream))
+
+    if file_type in {"DOCX", "PPTX"}:
+        _inspect_zip(inspection, byte_stream)
+    elif file_type == "PDF":
+        _inspect_pdf(inspection, byte_stream)
+
+    _check_limit(inspection.image_pixels, config.MAX_TOTAL_IMAGE_PIXELS, "Document images have too many pixels in total")
+
+    return inspection
@@ -0,0 +1,237 @@
+import atexit
+import contextvars
+import functools
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+
+from app.util import config
+from app.util.json_util import dumps
+
+# Span of the current thread or task, None when the request is not traced
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """
+    Span returned when the request is not sampled, so instrumentation costs a context variable lookup.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """
+    Spans of one sampled request, exported together once the root span ends.
+    """
+
+    __slots__ = ("trace_id", "spans", "lock")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """
+    A timed operation of a traced request with its parent span and attributes.
+    """
+
+    __slots__ = ("trace", "span_id", "parent", "name", "attributes", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, trace, parent, name, attributes):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_value is not None:
+            self.error = str(exc_value)
+
+        with self.trace.lock:
+            self.trace.spans.append(self)
+
+        # The root span ends last, export the whole trace with it
+        if self.parent is None:
+            _exporter.export(self.trace)
+        return False
+
+
+def start_trace(name, **attributes):
+    """
+    Starts the root span of a request if the request is sampled.
+
+    :param name: Name of the root span
+    :param attributes: Attributes of the span
+    :return: A Span, or a no-op span when tracing is off or the request is not sampled
+    """
+    if config.TRACING_SAMPLE_RATE <= 0 or random.random() >= config.TRACING_SAMPLE_RATE:
+        return NOOP_SPAN
+    return Span(_Trace(), None, name, attributes)
+
+
+def span(name, **attributes):
+    """
+    Starts a child span of the current span.
+
+    :param name: Name of the span
+    :param attributes: Attributes of the span, e.g. page number, image size, xref
+    :return: A Span, or a no-op span when the current request is not traced
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, parent, name, attributes)
+
+
+def traced(name):
+    """
+    Decorator running a function in a span, or in a new trace when called outside of one.
+
+    :param name: Name of the span
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            current = span(name) if _current_span.get() is not None else start_trace(name)
+            with current:
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(function):
+    """
+    Binds a function to the current tracing context, so spans it starts in another thread
+    (e.g. an executor) are children of the current span.
+
+    :param function: Function to run in another thread
+    :return: The bound function
+    """
+    if _current_span.get() is None:
+        return function
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(trace):
+    """
+    Converts a trace to the OTLP/HTTP JSON encoding.
+
+    :param trace: Finished _Trace
+    :return: The OTLP ExportTraceServiceRequest as a dictionary
+    """
+    spans = []
+    for finished_span in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": finished_span.span_id,
+            "name": finished_span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(finished_span.start_ns),
+            "endTimeUnixNano": str(finished_span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in finished_span.attributes.items()],
+            "status": {"code": 2, "message": finished_span.error} if finished_span.error else {"code": 1},
+        }
+        if finished_span.parent is not None:
+            otlp_span["parentSpanId"] = finished_span.parent.span_id
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": config.TRACING_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app"}, "spans": spans}],
+        }]
+    }
+
+
+class _Exporter:
+    """
+    Exports finished traces from a background thread, so requests never wait on the file or the collector.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            # Drop traces rather than slow down requests when the exporter falls behind
+            pass
+
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                self._write(dumps(_to_otlp(trace)))
+            except Exception as e:
+                print(f"Failed to export trace {trace.trace_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _write(payload):
+        if config.TRACING_OTLP_ENDPOINT:
+            http_request = urllib.request.Request(config.TRACING_OTLP_ENDPOINT, data=payload, method="POST")
+            http_request.add_header("Content-Type", "application/json")
+            with urllib.request.urlopen(http_request, timeout=10) as response:
+                response.read()
+        else:
+            with open(config.TRACING_FILE, "ab") as trace_file:
+                trace_file.write(payload + b"\n")
+
+
+_exporter = _Exporter()
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import threading
+import time
+
+from app.util import config
+from app.util.json_util import dumps
+
+_record_lock = threading.Lock()
+
+
+def record_extract_request(file_type, document_byte_stream, prefer, ocr_profile=None):
+    """
+    Appends a sanitized /extract request to the traffic record file, in the JSONL
+    format replayed by tools/load_harness.py. Only the file type, the Prefer header,
+    the OCR profile and a reference to the payload are recorded, never other headers.
+
+    :param file_type: File type of the request
+    :param document_byte_stream: Decoded document bytes
+    :param prefer: Value of the Prefer header
+    :param ocr_profile: OCR profile name of the request, if any
+    """
+    if not config.TRAFFIC_RECORD_FILE:
+        return
+
+    digest = hashlib.sha256(document_byte_stream).hexdigest()
+    record = {
+        "timestamp": time.time(),
+        "file_type": file_type,
+        "prefer": prefer,
+        "ocr_profile": ocr_profile,
+        "size": len(document_byte_stream),
+        "sha256": digest,
+        "payload": None,
+    }
+
+    try:
+        # Keep the payload only where the operator explicitly asked for it
+        if config.TRAFFIC_PAYLOAD_DIR:
+            payload_path = os.path.join(config.TRAFFIC_PAYLOAD_DIR, digest)
+            if not os.path.exists(payload_path):
+                os.makedirs(config.TRAFFIC_PAYLOAD_DIR, exist_ok=True)
+                with open(payload_path, "wb") as payload_file:
+                    payload_file.write(document_byte_stream)
+            record["payload"] = digest
+
+        with _record_lock, open(config.TRAFFIC_RECORD_FILE, "ab") as record_file:
+            record_file.write(dumps(record) + b"\n")
+
+    except OSError as e:
+        # Recording must never fail the request it records
+        print(f"Failed to record request: {e}")
@@ -90,4 +90,27 @@ def delete_file(file_path):
             return False
     except Exception as e:
         print(f"An error occurred while deleting the file: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def write_file_atomically(file_path, data):
+    """
+    Writes data to a file through a temporary file renamed into place,
+    so concurrent readers never see a partially written file.
+
+    Args:
+        file_path (str): The path of the file to write.
+        data (bytes): The content of the file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,65 @@
+from app.util.ocr_tiling import OcrLine, lines_from_ocr_data, split_into_bands, stitch_band_lines
+
+# Two bands of 1200 rows overlapping by 120 rows, cut in the middle of the overlap at row 1140
+BANDS = [(0, 1200), (1080, 2280)]
+
+
+def test_split_into_bands_covers_the_image():
+    assert split_into_bands(2280, 1200, 120) == BANDS
+
+
+def test_split_into_bands_extends_the_last_band_over_a_sliver():
+    assert split_into_bands(2300, 1200, 120) == [(0, 1200), (1080, 2300)]
+
+
+def test_split_into_bands_single_band():
+    assert split_into_bands(800, 1200, 120) == [(0, 800)]
+
+
+def test_stitch_keeps_similar_lines_on_both_sides_of_the_overlap():
+    first_band = [OcrLine(100, 140, "a"), OcrLine(1000, 1040, "Item 3"), OcrLine(1040, 1080, "Item 4")]
+    second_band = [OcrLine(70, 110, "Item 5"), OcrLine(120, 160, "Item 6"), OcrLine(920, 960, "b")]
+
+    assert stitch_band_lines(BANDS, [first_band, second_band]) == "a\nItem 3\nItem 4\nItem 5\nItem 6\nb"
+
+
+def test_stitch_keeps_a_line_inside_the_overlap_once():
+    # Rows 1100-1130 are read whole by both bands
+    first_band = [OcrLine(1000, 1040, "before"), OcrLine(1100, 1130, "shared line")]
+    second_band = [OcrLine(20, 50, "shared line"), OcrLine(200, 240, "after")]
+
+    assert stitch_band_lines(BANDS, [first_band, second_band]) == "before\nshared line\nafter"
+
+
+def test_stitch_keeps_the_whole_reading_of_a_line_cut_by_a_band_edge():
+    # Rows 1180-1220 are cut by the bottom of the first band and read whole by the second
+    first_band = [OcrLine(1000, 1040, "above"), OcrLine(1180, 1200, "Tota")]
+    second_band = [OcrLine(100, 140, "Total: $12.00")]
+
+    assert stitch_band_lines(BANDS, [first_band, second_band]) == "above\nTotal: $12.00"
+
+
+def test_stitch_keeps_repeated_table_rows():
+    first_band = [OcrLine(1040, 1070, "$10.00")]
+    second_band = [OcrLine(90, 120, "$12.00"), OcrLine(130, 160, "$12.00")]
+
+    assert stitch_band_lines(BANDS, [first_band, second_band]) == "$10.00\n$12.00\n$12.00"
+
+
+def test_stitch_single_band():
+    assert stitch_band_lines([(0, 500)], [[OcrLine(10, 30, "only"), OcrLine(40, 60, "band")]]) == "only\nband"
+
+
+def test_lines_from_ocr_data_groups_words_by_line():
+    data = {
+        "level": [4, 5, 5, 4, 5, 5],
+        "page_num": [1, 1, 1, 1, 1, 1],
+        "block_num": [1, 1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [1, 1, 1, 2, 2, 2],
+        "top": [10, 12, 10, 50, 50, 52],
+        "height": [22, 20, 22, 20, 20, 20],
+        "text": ["", "Hello", "world", "", "Second", " "],
+    }
+
+    assert lines_from_ocr_data(data) == [OcrLine(10, 32, "Hello world"), OcrLine(50, 70, "Second")]
@@ -0,0 +1,96 @@
+import pytest
+from PIL import Image, ImageDraw
+
+pytest.importorskip("numpy")
+
+from app.util import config, perceptual_hash
+from app.util.perceptual_hash import document_scope, find_known_image, remember_image
+
+WORDS = ["lorem", "ipsum", "dolor", "amet", "tempor", "labore", "magna", "aliqua", "veniam", "nostrud"]
+
+
+def _text_page(width, height, seed):
+    """
+    Renders a page of text with a fixed layout: the same margins, line positions and
+    line lengths on every page, different words depending on the seed.
+    """
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for line_number, top in enumerate(range(height // 10, height - height // 10, 14)):
+        words = [WORDS[(seed * 7 + line_number * 3 + index) % len(WORDS)] for index in range(6)]
+        draw.text((width // 10, top), " ".join(words), fill=0)
+    return image
+
+
+def _logo(width, height):
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width // 10, height // 10, width // 2, height * 9 // 10), fill=0)
+    draw.rectangle((width * 6 // 10, height // 4, width * 9 // 10, height * 3 // 4), fill=96)
+    return image
+
+
+@pytest.fixture(autouse=True)
+def boilerplate_index(monkeypatch):
+    monkeypatch.setattr(config, "PHASH_ENABLED", True)
+    monkeypatch.setattr(config, "PHASH_MODE", "reuse")
+    monkeypatch.setattr(config, "PHASH_MIN_DOCUMENTS", 3)
+    monkeypatch.setattr(perceptual_hash, "_indexes", {})
+
+
+def _ocr(image, text):
+    """
+    Stands in for ocr_image: returns the stored text of a known image, or OCRs it as text.
+    """
+    image_key, known_text = find_known_image(image, "balanced")
+    if known_text is not None:
+        return known_text
+    if image_key is not None:
+        remember_image(image_key, "balanced", text)
+    return text
+
+
+def test_pages_with_the_same_layout_keep_their_own_text():
+    pages = [_text_page(400, 500, seed) for seed in range(4)]
+
+    # Pages of one document are never boilerplate of each other
+    with document_scope("contract"):
+        texts = [_ocr(page, f"page {number}") for number, page in enumerate(pages)]
+
+    assert texts == ["page 0", "page 1", "page 2", "page 3"]
+
+
+@pytest.mark.parametrize("width, height", [(256, 256), (400, 500), (1700, 2200)])
+def test_same_layout_pages_across_documents_keep_their_own_text(width, height):
+    # Small pages are told apart by their hashes, larger ones are above the size limit
+    first, second = _text_page(width, height, 0), _text_page(width, height, 1)
+
+    for document in ["first", "second", "third", "fourth"]:
+        with document_scope(document):
+            assert _ocr(first, "first page") == "first page"
+            assert _ocr(second, "second page") == "second page"
+
+
+def test_logo_is_reused_once_seen_in_enough_documents():
+    logo = _logo(200, 100)
+
+    with document_scope("first"):
+        assert _ocr(logo, "ACME") == "ACME"
+    with document_scope("second"):
+        assert _ocr(logo, "ACME") == "ACME"
+    with document_scope("third"):
+        assert _ocr(logo.resize((180, 90)), "not OCR'd") == "ACME"
+
+
+def test_logo_with_another_aspect_ratio_is_not_reused():
+    logo = _logo(200, 100)
+    for document in ["first", "second", "third"]:
+        with document_scope(document):
+            _ocr(logo, "ACME")
+
+    with document_scope("fourth"):
+        assert _ocr(logo.resize((200, 200)), "square") == "square"
+
+
+def test_images_outside_a_document_are_not_indexed():
+    assert find_known_image(_logo(200, 100), "balanced") == (None, None)
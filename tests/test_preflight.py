@@ -0,0 +1,131 @@
+import io
+import struct
+import zipfile
+import zlib
+
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+
+from app.util import config
+from app.util.preflight import DocumentRejected, MalformedDocument, check_image_header, inspect_document
+
+
+def _png_header(width, height):
+    """
+    Builds a PNG that declares the given dimensions without holding any pixel data.
+    """
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", b"") + chunk(b"IEND", b""))
+
+
+def _png(width, height):
+    image_bytes = io.BytesIO()
+    Image.new("L", (width, height), 255).save(image_bytes, "PNG")
+    return image_bytes.getvalue()
+
+
+def _docx(entries):
+    package_bytes = io.BytesIO()
+    with zipfile.ZipFile(package_bytes, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("word/document.xml", "<w:document/>")
+        for name, data in entries.items():
+            package.writestr(name, data)
+    return package_bytes.getvalue()
+
+
+def _pdf(page_count, image_size=None):
+    pdf_document = fitz.open()
+    for _ in range(page_count):
+        pdf_document.new_page()
+
+    if image_size is not None:
+        pdf_document[0].insert_image(fitz.Rect(0, 0, 100, 100), stream=_png(10, 10))
+        # Declare a larger image than the stored one, as a crafted PDF would
+        xref = pdf_document[0].get_images()[0][0]
+        pdf_document.xref_set_key(xref, "Width", str(image_size[0]))
+        pdf_document.xref_set_key(xref, "Height", str(image_size[1]))
+
+    return pdf_document.tobytes()
+
+
+def test_image_header_returns_the_pixel_count():
+    assert check_image_header(_png_header(300, 200)) == 60000
+
+
+def test_image_header_rejects_images_over_the_limit():
+    with pytest.raises(DocumentRejected):
+        check_image_header(_png_header(11000, 11000))
+
+
+def test_image_header_rejects_images_pil_refuses_to_open():
+    # Far above PIL's own decompression bomb limit
+    with pytest.raises(DocumentRejected):
+        check_image_header(_png_header(20000, 20000))
+
+
+def test_image_header_ignores_unknown_formats():
+    assert check_image_header(b"not an image") == 0
+
+
+def test_zip_counts_images():
+    inspection = inspect_document("DOCX", _docx({"word/media/image1.png": _png(40, 30)}))
+
+    assert inspection.image_count == 1
+    assert inspection.image_pixels == 1200
+
+
+def test_zip_rejects_an_image_bomb():
+    with pytest.raises(DocumentRejected):
+        inspect_document("DOCX", _docx({"word/media/image1.png": _png_header(20000, 20000)}))
+
+
+def test_zip_rejects_a_compression_bomb():
+    with pytest.raises(DocumentRejected):
+        inspect_document("DOCX", _docx({"word/bomb.xml": b"\0" * (8 * 1024 * 1024)}))
+
+
+def test_zip_rejects_too_many_entries(monkeypatch):
+    monkeypatch.setattr(config, "MAX_ZIP_ENTRIES", 2)
+
+    with pytest.raises(DocumentRejected):
+        inspect_document("DOCX", _docx({"a.xml": "a", "b.xml": "b"}))
+
+
+def test_zip_reports_malformed_packages():
+    with pytest.raises(MalformedDocument):
+        inspect_document("DOCX", b"PK\x03\x04 not a zip")
+
+
+def test_pdf_counts_pages_and_images():
+    inspection = inspect_document("PDF", _pdf(3, image_size=(10, 10)))
+
+    assert inspection.page_count == 3
+    assert inspection.image_count == 1
+    assert inspection.image_pixels == 100
+
+
+def test_pdf_rejects_declared_image_bombs():
+    with pytest.raises(DocumentRejected):
+        inspect_document("PDF", _pdf(1, image_size=(20000, 20000)))
+
+
+def test_pdf_rejects_too_many_pages(monkeypatch):
+    monkeypatch.setattr(config, "MAX_PDF_PAGES", 2)
+
+    with pytest.raises(DocumentRejected):
+        inspect_document("PDF", _pdf(3))
+
+
+def test_pdf_reports_malformed_documents():
+    with pytest.raises(MalformedDocument):
+        inspect_document("PDF", b"not a pdf")
+
+
+def test_txt_is_not_inspected():
+    inspection = inspect_document("TXT", b"plain text")
+
+    assert (inspection.size, inspection.image_count) == (10, 0)
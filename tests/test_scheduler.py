@@ -0,0 +1,43 @@
+from app.scheduler import DEFAULT_COST_RATES, CostModel
+from app.util.page_store import count_reused_units, record_reused_units
+from app.util.preflight import DocumentInspection
+
+SCAN = DocumentInspection("PDF", 1_000_000, page_count=10, image_count=10, image_pixels=10_000_000)
+
+
+def test_observe_calibrates_from_extracted_work():
+    cost_model = CostModel(calibration_weight=1.0)
+
+    cost_model.observe(SCAN, {"text": 0.1, "image": 7.0})
+
+    assert cost_model._rate("PDF", "text_per_page") == 0.01
+    assert cost_model._rate("PDF", "image_per_image") + cost_model._rate("PDF", "image_per_megapixel") == 0.7
+
+
+def test_observe_ignores_reused_pages_and_images():
+    cost_model = CostModel(calibration_weight=1.0)
+
+    # Nine pages and their images were answered from the page store
+    cost_model.observe(SCAN, {"text": 0.01, "image": 0.7}, {"text": 9, "image": 9})
+
+    assert cost_model._rate("PDF", "text_per_page") == 0.01
+    assert cost_model._rate("PDF", "image_per_image") + cost_model._rate("PDF", "image_per_megapixel") == 0.7
+
+
+def test_observe_skips_fully_reused_stages():
+    cost_model = CostModel(calibration_weight=1.0)
+
+    cost_model.observe(SCAN, {"text": 0.0001, "image": 0.001}, {"text": 10, "image": 10})
+
+    assert cost_model._rate("PDF", "text_per_page") == DEFAULT_COST_RATES["text_per_page"]
+    assert cost_model._rate("PDF", "image_per_image") == DEFAULT_COST_RATES["image_per_image"]
+
+
+def test_reused_units_are_only_counted_inside_a_block():
+    record_reused_units("text", 1)
+
+    with count_reused_units({}) as counts:
+        record_reused_units("text", 2)
+        record_reused_units("image", 3)
+
+    assert counts == {"text": 2, "image": 3}
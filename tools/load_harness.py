@@ -0,0 +1,306 @@
+"""
+Replays recorded /extract traffic against a local ExtractorService instance and
+reports throughput, latency percentiles, error rates and server RSS over time.
+
+Traffic is recorded by the service itself when EXTRACTOR_TRAFFIC_RECORD_FILE is set
+(see app/util/traffic_recorder.py). Each JSONL line looks like:
+
+    {"timestamp": 1700000000.0, "file_type": "PDF", "prefer": "return=representation",
+     "ocr_profile": null, "size": 12345, "sha256": "<hex>", "payload": "<hex>"}
+
+"payload" names a file in the payload directory (EXTRACTOR_TRAFFIC_PAYLOAD_DIR).
+Records without a payload are resolved by their digest in --payload-dir, and skipped
+if the document is not there.
+
+Example:
+
+    python tools/load_harness.py traffic.jsonl --payload-dir payloads \\
+        --url http://127.0.0.1:5002/extract --concurrency 8 --rate 4 --server-pid 1234
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def load_requests(record_path, payload_dir):
+    """
+    Reads a traffic record file and resolves the payload file of each request.
+    Payloads are only read when their request is sent, so large corpora are not held in memory.
+
+    :param record_path: Path of the JSONL record file
+    :param payload_dir: Directory holding the recorded payloads, named by digest
+    :return: A tuple (list of (record, payload path), number of skipped records)
+    """
+    requests = []
+    skipped = 0
+
+    with open(record_path, "r", encoding="utf-8") as record_file:
+        for line in record_file:
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            payload_name = record.get("payload") or record.get("sha256")
+            payload_path = os.path.join(payload_dir, payload_name) if payload_dir and payload_name else None
+
+            if not payload_path or not os.path.exists(payload_path):
+                skipped += 1
+                continue
+
+            requests.append((record, payload_path))
+
+    return requests, skipped
+
+
+def build_request_body(record, payload_path):
+    """
+    Builds the JSON body of a recorded /extract request from its payload file.
+
+    :param record: Traffic record of the request
+    :param payload_path: Path of the recorded payload
+    :return: The request body bytes
+    """
+    with open(payload_path, "rb") as payload_file:
+        body = {
+            "file_type": record["file_type"],
+            "data": base64.b64encode(payload_file.read()).decode("ascii"),
+        }
+    if record.get("ocr_profile"):
+        body["ocr_profile"] = record["ocr_profile"]
+
+    return json.dumps(body).encode("utf-8")
+
+
+def read_rss_bytes(pid):
+    """
+    Reads the resident set size of a process from /proc.
+
+    :param pid: Process id of the server
+    :return: RSS in bytes, or None if it cannot be read
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of a sorted list.
+
+    :param sorted_values: Sorted list of numbers
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :return: The percentile value, or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def send_request(url, record, payload_path, timeout, scheduled_at=None):
+    """
+    Sends a single /extract request.
+
+    :param scheduled_at: time.perf_counter() value of the scheduled arrival of the request. Latency is
+                         measured from it, so time spent waiting for a free client counts as latency.
+                         None to measure from the moment the request is built.
+    :return: A tuple (HTTP status or None on connection errors, latency in seconds)
+    """
+    started = time.perf_counter() if scheduled_at is None else scheduled_at
+    body = build_request_body(record, payload_path)
+
+    http_request = urllib.request.Request(url, data=body, method="POST")
+    http_request.add_header("Content-Type", "application/json")
+    if record.get("prefer"):
+        http_request.add_header("Prefer", record["prefer"])
+
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+
+    return status, time.perf_counter() - started
+
+
+def replay(requests, url, concurrency, rate, arrival, total, timeout, server_pid, rss_interval):
+    """
+    Replays requests at a given arrival rate with a fixed number of concurrent clients.
+
+    With a rate the replay is open loop: requests are queued at their scheduled arrival time
+    without waiting for the clients, and their latency is measured from that time. When the
+    server falls behind, queueing delay shows up in the latency percentiles instead of slowing
+    down the arrivals (coordinated omission). Without a rate every client sends its next request
+    as soon as the previous one completes.
+
+    :param requests: List of (record, payload path) tuples, cycled until total requests are sent
+    :param url: URL of the /extract endpoint
+    :param concurrency: Number of concurrent client threads
+    :param rate: Arrival rate in requests per second, 0 to send as fast as the clients allow
+    :param arrival: "poisson" for exponential inter-arrival times, "uniform" for a fixed interval
+    :param total: Number of requests to send
+    :param timeout: Request timeout in seconds
+    :param server_pid: Process id of the server for RSS sampling, None to skip
+    :param rss_interval: Seconds between RSS samples
+    :return: The report dictionary
+    """
+    # Unbounded so that the arrival loop never blocks on busy clients
+    work = queue.Queue()
+    results = []
+    results_lock = threading.Lock()
+    rss_samples = []
+    done = threading.Event()
+
+    def client():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            record, payload_path, scheduled_at = item
+            status, latency = send_request(url, record, payload_path, timeout, scheduled_at)
+            with results_lock:
+                results.append((record["file_type"], status, latency))
+
+    def sample_rss():
+        while not done.is_set():
+            rss = read_rss_bytes(server_pid)
+            if rss is not None:
+                rss_samples.append((round(time.perf_counter() - started, 3), rss))
+            done.wait(rss_interval)
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+
+    sampler = None
+    if server_pid:
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+
+    next_arrival = time.perf_counter()
+    for index in range(total):
+        record, payload_path = requests[index % len(requests)]
+
+        scheduled_at = None
+        if rate > 0:
+            # Wait for the scheduled arrival time of the request
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            scheduled_at = next_arrival
+            next_arrival += random.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+
+        work.put((record, payload_path, scheduled_at))
+
+    for _ in clients:
+        work.put(None)
+    for thread in clients:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    done.set()
+    if sampler is not None:
+        sampler.join()
+
+    return build_report(results, elapsed, rss_samples)
+
+
+def build_report(results, elapsed, rss_samples):
+    """
+    Summarises the replay results.
+
+    :param results: List of (file type, status, latency) tuples
+    :param elapsed: Duration of the replay in seconds
+    :param rss_samples: List of (seconds since start, RSS bytes) tuples
+    :return: The report dictionary
+    """
+    latencies = sorted(latency for _, _, latency in results)
+    errors = [status for _, status, _ in results if status is None or status >= 400]
+
+    status_counts = {}
+    for _, status, _ in results:
+        key = str(status) if status is not None else "connection_error"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    per_file_type = {}
+    for file_type in sorted({file_type for file_type, _, _ in results}):
+        type_latencies = sorted(latency for result_type, _, latency in results if result_type == file_type)
+        per_file_type[file_type] = {
+            "requests": len(type_latencies),
+            "p50_seconds": percentile(type_latencies, 0.50),
+            "p95_seconds": percentile(type_latencies, 0.95),
+            "p99_seconds": percentile(type_latencies, 0.99),
+        }
+
+    return {
+        "requests": len(results),
+        "duration_seconds": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "p50_seconds": percentile(latencies, 0.50),
+        "p95_seconds": percentile(latencies, 0.95),
+        "p99_seconds": percentile(latencies, 0.99),
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "status_counts": status_counts,
+        "per_file_type": per_file_type,
+        "rss_peak_bytes": max((rss for _, rss in rss_samples), default=None),
+        "rss_samples": rss_samples,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded /extract traffic against a local instance.")
+    parser.add_argument("records", help="JSONL traffic record file")
+    parser.add_argument("--payload-dir", default="", help="directory of recorded payloads, named by SHA-256 digest")
+    parser.add_argument("--url", default="http://127.0.0.1:5002/extract", help="URL of the /extract endpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of concurrent clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="arrival rate in requests/second, 0 for closed loop")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson", help="inter-arrival distribution")
+    parser.add_argument("--requests", type=int, default=0, help="number of requests to send, 0 for one pass")
+    parser.add_argument("--timeout", type=float, default=600.0, help="request timeout in seconds")
+    parser.add_argument("--server-pid", type=int, default=None, help="server process id for RSS sampling")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="seconds between RSS samples")
+    parser.add_argument("--report", default="", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    requests, skipped = load_requests(args.records, args.payload_dir)
+    if skipped:
+        print(f"Skipped {skipped} records without an available payload", file=sys.stderr)
+    if not requests:
+        print("No replayable requests found", file=sys.stderr)
+        return 1
+
+    report = replay(requests, args.url, max(args.concurrency, 1), args.rate, args.arrival,
+                    args.requests or len(requests), args.timeout, args.server_pid, args.rss_interval)
+
+    summary = {key: value for key, value in report.items() if key != "rss_samples"}
+    print(json.dumps(summary, indent=2))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())